@@ -1,31 +1,314 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Depends, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
+import hashlib
+import json
+import os
+import random
 import re
-from faker import Faker
+import time
 from typing import Optional, Dict, List
 from fastapi import FastAPI
 from pydantic import BaseModel
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 import logging
+import gazetteer
+from regex_detector import RegexPIIDetector, RegexTimeout
+from inference_pool import InferencePool, InferenceBusy, InferenceTimeout, MicroBatcher
+from detection_cache import DetectionCache
+from chunking import token_windows, merge_window_entities
+from segments import MODES as SEGMENT_MODES, segment_spans
+from model_backend import ModelLoader
+from streaming import FORMATS, LineSplitter, parse_line, render_line
+from spans import MERGE_POLICIES, merge_entities as merge_spans, rewrite
+from pseudonymizer import Pseudonymizer
+from labels import filter_entities, model_enabled, regex_families
+from metrics import Registry, SIZE_BUCKETS, trace
+import profiling
+from cascade import Cascade, MODES as CASCADE_MODES
+from responses import COLUMNS, columnar, compact_response, msgpack_available, wants_msgpack
+from incremental import (
+    DetectionSession, EditError, SessionStore, apply_edit, context_slice,
+    cover_edit, edit_window, shift_entities, splice_entities
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
-faker = Faker()
 
-tokenizer = AutoTokenizer.from_pretrained("iiiorg/piiranha-v1-detect-personal-information")
-model = AutoModelForTokenClassification.from_pretrained("iiiorg/piiranha-v1-detect-personal-information")
+# Surname, given name, street and estate lists (see gazetteer/), loaded once
+GAZETTEER_DIR = os.environ.get("PII_GAZETTEER_DIR", gazetteer.DATA_DIR)
+
+# Regex patterns are compiled once here and shared by every request
+basic_pii_detector = RegexPIIDetector(gazetteer=gazetteer.load(GAZETTEER_DIR))
+
+MODEL_NAME = "iiiorg/piiranha-v1-detect-personal-information"
+
+# "torch" (fp32), "int8", "onnx" or "onnx-int8"; see docs/BACKEND.md for the
+# parity and latency numbers behind each
+MODEL_BACKEND = os.environ.get("PII_MODEL_BACKEND", "torch")
+
+# The model loads in a background thread once the server is up ("background")
+# or on the first request that needs it ("lazy"). Until it is ready, requests
+# are answered from regex detection alone and /readyz reports 503.
+MODEL_LOAD = os.environ.get("PII_MODEL_LOAD", "background")
+# Threads per forward pass; unset uses every core, which several worker
+# processes on one machine would oversubscribe (serve.py sets it per worker)
+MODEL_THREADS = int(os.environ.get("PII_MODEL_THREADS", "0")) or None
+model_loader = ModelLoader(MODEL_NAME, MODEL_BACKEND, onnx_dir=os.environ.get("PII_ONNX_DIR"),
+                           threads=MODEL_THREADS)
+MODEL_VERSION = f"{MODEL_NAME}/{MODEL_BACKEND}"
+
+# Texts longer than the model input are split into overlapping token windows
+# that are run in batches and merged back. Windows are tokenized off the event
+# loop with the loader's private tokenizer copy, as the backend's copy is in
+# use by the worker threads. Window size defaults to the model input size.
+CHUNK_TOKENS = int(os.environ.get("PII_CHUNK_TOKENS", "0"))
+CHUNK_OVERLAP = int(os.environ.get("PII_CHUNK_OVERLAP", "64"))
+
+# Piiranha runs in a bounded thread pool so a long message cannot stall the
+# event loop. When the pool is full, either reject with 429 ("reject") or
+# answer from regex detection alone ("degrade").
+MODEL_WORKERS = int(os.environ.get("PII_MODEL_WORKERS", "2"))
+MODEL_MAX_PENDING = int(os.environ.get("PII_MODEL_MAX_PENDING", "8"))
+MODEL_TIMEOUT = float(os.environ.get("PII_MODEL_TIMEOUT", "10"))
+MODEL_OVERLOAD_POLICY = os.environ.get("PII_MODEL_OVERLOAD_POLICY", "degrade")
+
+# Concurrent requests arriving within BATCH_MAX_WAIT_MS are run through the
+# model as one padded batch of at most BATCH_MAX_SIZE texts. Raise the wait
+# for throughput, lower it (or set the size to 1) for latency.
+BATCH_MAX_SIZE = int(os.environ.get("PII_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("PII_BATCH_MAX_WAIT_MS", "5"))
+
+def run_pii_batch(texts):
+    """Run Piiranha over a list of texts, returning one entity list per text"""
+    MODEL_BATCH_SIZE.observe(len(texts))
+    with STAGE_SECONDS.time("model_inference"):
+        return model_loader.run_batch(texts)
+
+inference_pool = InferencePool(
+    run_pii_batch,
+    workers=MODEL_WORKERS,
+    max_pending=MODEL_MAX_PENDING,
+    timeout=MODEL_TIMEOUT
+)
+model_batcher = MicroBatcher(
+    inference_pool,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait=BATCH_MAX_WAIT_MS / 1000
+)
+
+# Detection results are cached in memory only, keyed by a digest of the text,
+# so repeated keystroke requests and the two endpoints share one detection
+detection_cache = DetectionCache(
+    max_bytes=int(os.environ.get("PII_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.environ.get("PII_CACHE_TTL", "300")),
+    version=MODEL_VERSION
+)
 
-pii_detector = pipeline(
-    "token-classification",
-    model=model,
-    tokenizer=tokenizer,
-    aggregation_strategy="simple"
+# The model runs per segment of a text ("sentences" or "lines"; "off" runs it
+# on whole texts), and segment results are cached for PII_SEGMENT_CACHE_TTL
+# seconds, so text that recurs inside different messages (signatures,
+# templates, the unchanged part of an edited message) only goes through the
+# model once. Like the detection cache, it is keyed by a secret digest.
+MODEL_SEGMENTS = os.environ.get("PII_MODEL_SEGMENTS", "sentences")
+if MODEL_SEGMENTS not in SEGMENT_MODES:
+    raise ValueError(f"PII_MODEL_SEGMENTS must be one of {', '.join(SEGMENT_MODES)}")
+segment_cache = DetectionCache(
+    max_bytes=int(os.environ.get("PII_SEGMENT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.environ.get("PII_SEGMENT_CACHE_TTL", "3600")),
+    version=MODEL_VERSION
 )
 
+# Regex detection of a text stops after PII_REGEX_BUDGET_MS plus
+# PII_REGEX_BUDGET_MS_PER_KB per 1000 characters (the patterns run in linear
+# time, about 2 ms per KB of dense PII) and answers with the entities found so
+# far, flagged regex_timeout. PII_REGEX_BUDGET_MS=0 turns the budget off.
+REGEX_BUDGET_MS = float(os.environ.get("PII_REGEX_BUDGET_MS", "100"))
+REGEX_BUDGET_MS_PER_KB = float(os.environ.get("PII_REGEX_BUDGET_MS_PER_KB", "10"))
+
+# Live input boxes edited through /detect_pii/incremental. Sessions hold the
+# text in memory only and are dropped when idle or when the store is full.
+incremental_sessions = SessionStore(
+    max_sessions=int(os.environ.get("PII_SESSION_MAX", "1000")),
+    ttl=float(os.environ.get("PII_SESSION_TTL", "600"))
+)
+INCREMENTAL_RADIUS = int(os.environ.get("PII_INCREMENTAL_RADIUS", "256"))
+
+# Bulk jobs (/detect_pii/batch, detect_pii_batch) run the model on batches of
+# BULK_BATCH_SIZE texts or windows, one batch at a time per job
+BULK_BATCH_SIZE = int(os.environ.get("PII_BULK_BATCH_SIZE", "32"))
+BULK_MAX_ITEMS = int(os.environ.get("PII_BULK_MAX_ITEMS", "10000"))
+
+# Streamed anonymization (/anonymize/stream, scrub.py) holds one batch of
+# records at a time; longer lines are replaced by an error record
+STREAM_MAX_LINE = int(os.environ.get("PII_STREAM_MAX_LINE", str(1024 * 1024)))
+
+# How overlapping model and regex entities are settled: "model" keeps every
+# model entity, "longest" and "confidence" rank all entities together
+MERGE_POLICY = os.environ.get("PII_MERGE_POLICY", "model")
+if MERGE_POLICY not in MERGE_POLICIES:
+    raise ValueError(f"PII_MERGE_POLICY must be one of {', '.join(MERGE_POLICIES)}")
+
+# Texts the model is skipped on after regex detection: "covered" when every
+# sign of PII (digits, "@", capitalised or non-ASCII words, gazetteer names
+# and places) lies inside a regex entity, "clean" only when there is none,
+# "off" never. A PII_CASCADE_AUDIT_RATE fraction of skipped texts is run
+# through the model anyway in the background to measure the recall lost.
+CASCADE_MODE = os.environ.get("PII_CASCADE", "covered")
+if CASCADE_MODE not in CASCADE_MODES:
+    raise ValueError(f"PII_CASCADE must be one of {', '.join(CASCADE_MODES)}")
+CASCADE_AUDIT_RATE = float(os.environ.get("PII_CASCADE_AUDIT_RATE", "0.01"))
+cascade = Cascade(CASCADE_MODE, basic_pii_detector.gazetteer.first_words(
+    basic_pii_detector.names | basic_pii_detector.places
+))
+cascade_audits = set()
+
+# Fake values are derived from a keyed digest of the original, so a value keeps
+# its pseudonym across keystrokes and requests. Without PII_PSEUDONYM_KEY the
+# key is random per process; a persistent store needs a fixed key.
+PSEUDONYM_KEY = os.environ.get("PII_PSEUDONYM_KEY")
+PSEUDONYM_DB = os.environ.get("PII_PSEUDONYM_DB")
+if PSEUDONYM_DB and not PSEUDONYM_KEY:
+    raise ValueError("PII_PSEUDONYM_DB requires PII_PSEUDONYM_KEY")
+pseudonymizer = Pseudonymizer(
+    hashlib.sha256(PSEUDONYM_KEY.encode("utf-8")).digest() if PSEUDONYM_KEY else os.urandom(32),
+    max_entries=int(os.environ.get("PII_PSEUDONYM_MAX", "100000")),
+    db_path=PSEUDONYM_DB
+)
+
+# Admin endpoints require X-Admin-Token when PII_ADMIN_TOKEN is set,
+# otherwise they are only served to loopback clients
+ADMIN_TOKEN = os.environ.get("PII_ADMIN_TOKEN")
+
+def require_admin(request: Request):
+    if ADMIN_TOKEN:
+        if request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+            raise HTTPException(status_code=403, detail="Admin token required")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="Admin endpoints are local-only")
+
+def is_admin(scope):
+    """require_admin's rule for a raw ASGI scope, as a bool"""
+    if ADMIN_TOKEN:
+        return dict(scope["headers"]).get(b"x-admin-token") == ADMIN_TOKEN.encode()
+    client = scope.get("client")
+    return client is not None and client[0] in ("127.0.0.1", "::1")
+
+# /admin/profile samples the stacks of the worker that serves it for at
+# most PII_PROFILE_MAX_SECONDS; one capture runs at a time
+PROFILE_MAX_SECONDS = float(os.environ.get("PII_PROFILE_MAX_SECONDS", "60"))
+profile_running = False
+
+# Prometheus-style metrics served on /metrics. Stages: "model" is what a
+# request waits for the model (queueing and batching included),
+# "model_inference" one forward pass, then "regex", "merge" and "rewrite".
+metrics = Registry()
+REQUESTS = metrics.counter("pii_requests_total", "HTTP requests", ("endpoint", "method", "status"))
+REQUEST_SECONDS = metrics.histogram("pii_request_seconds", "HTTP request latency", ("endpoint",))
+STAGE_SECONDS = metrics.histogram("pii_stage_seconds", "Latency per detection stage", ("stage",))
+INPUT_CHARS = metrics.histogram("pii_input_chars", "Characters per detected text", ("endpoint",), SIZE_BUCKETS)
+ENTITIES = metrics.counter("pii_entities_total", "Entities returned", ("entity_group",))
+DEGRADED = metrics.counter("pii_degraded_total", "Texts or text windows answered without the model", ("reason",))
+REGEX_TIMEOUTS = metrics.counter("pii_regex_timeouts_total", "Texts whose regex detection ran out of budget")
+MODEL_BATCH_SIZE = metrics.histogram("pii_model_batch_size", "Texts per model forward pass",
+                                     buckets=(1, 2, 4, 8, 16, 32, 64))
+metrics.callback("pii_model_ready", "1 once the model is loaded", lambda: int(model_loader.ready))
+metrics.callback("pii_inference_pending", "Model jobs running or queued", lambda: inference_pool.pending)
+metrics.callback("pii_batcher_queued", "Texts waiting for a micro-batch", lambda: model_batcher.queued)
+metrics.callback("pii_incremental_sessions", "Live incremental sessions", lambda: len(incremental_sessions))
+live_connections = set()
+metrics.callback("pii_live_connections", "Open /ws/detect connections", lambda: len(live_connections))
+LIVE_SUPERSEDED = metrics.counter("pii_live_superseded_total", "Live detections cancelled by newer text")
+for _prefix, _label, _cache in (("pii_cache", "Detection cache", detection_cache),
+                                ("pii_segment_cache", "Model segment cache", segment_cache)):
+    for _name, _stat, _type in (("hits", "hits", "counter"), ("misses", "misses", "counter"),
+                                ("evictions", "evictions", "counter"), ("entries", "entries", "gauge"),
+                                ("bytes", "bytes", "gauge")):
+        metrics.callback(f"{_prefix}_{_name}" + ("_total" if _type == "counter" else ""), f"{_label} {_stat}",
+                         lambda stat=_stat, cache=_cache: cache.stats()[stat], _type)
+metrics.callback("pii_cascade_decisions_total", "Texts sent to the model or skipped by the cascade",
+                 lambda: {(d,): n for d, n in cascade.stats()["decisions"].items()}, "counter", ("decision",))
+metrics.callback("pii_cascade_audited_total", "Skipped texts run through the model to audit the cascade",
+                 lambda: cascade.stats()["audited"], "counter")
+metrics.callback("pii_cascade_audit_missed_total", "Model entities in audited skipped texts that regex missed",
+                 lambda: cascade.stats()["audit_entities_missed"], "counter")
+metrics.callback("pii_pseudonym_hits_total", "Pseudonyms served from memory",
+                 lambda: pseudonymizer.stats()["hits"], "counter")
+metrics.callback("pii_pseudonym_misses_total", "Pseudonyms looked up in the store or generated",
+                 lambda: pseudonymizer.stats()["misses"], "counter")
+
+# Per-request summaries are logged at INFO for a sample of requests only
+LOG_SAMPLE_RATE = float(os.environ.get("PII_LOG_SAMPLE_RATE", "0.01"))
+
+def log_sampled(message):
+    if LOG_SAMPLE_RATE and random.random() < LOG_SAMPLE_RATE:
+        logger.info(message)
+    else:
+        logger.debug(message)
+
+def observe_detection(endpoint, text, entities):
+    INPUT_CHARS.observe(len(text), endpoint)
+    for entity in entities:
+        ENTITIES.inc(entity["entity_group"])
+
+def debug_timing(records, seconds):
+    """X-Debug-Timing value: milliseconds per stage, in Server-Timing syntax"""
+    stages = {}
+    for name, labels, elapsed in records:
+        if name == STAGE_SECONDS.name:
+            stages[labels[0]] = stages.get(labels[0], 0.0) + elapsed
+    parts = [f"{stage};dur={elapsed * 1000:.3f}" for stage, elapsed in stages.items()]
+    parts.append(f"total;dur={seconds * 1000:.3f}")
+    return ", ".join(parts)
+
+class RequestMetricsMiddleware:
+    """
+    Request count and latency per route template. Plain ASGI rather than
+    @app.middleware("http"), which would buffer /anonymize/stream.
+
+    Admin requests sending X-Debug-Timing get the time spent in each stage
+    back in an X-Debug-Timing response header; other requests pay one header
+    lookup for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+        records = None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if records is not None:
+                    value = debug_timing(records, time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-debug-timing", value.encode())]
+            await send(message)
+
+        try:
+            if any(name == b"x-debug-timing" for name, _ in scope["headers"]) and is_admin(scope):
+                with trace() as records:
+                    await self.app(scope, receive, send_with_status)
+            else:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            route = scope.get("route")
+            endpoint = route.path if route is not None else "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+            REQUESTS.inc(endpoint, scope["method"], str(status))
+
+app.add_middleware(RequestMetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -37,465 +320,135 @@ app.add_middleware(
 class TextRequest(BaseModel):
     text: str
     enabled_labels: Optional[Dict[str, bool]] = None
+    # Values get different pseudonyms in different scopes (e.g. per user)
+    pseudonym_scope: Optional[str] = None
+    # Columnar entities and no echoed input; MessagePack with Accept: application/msgpack
+    compact: bool = False
+    # With compact, also return the rewritten text
+    include_text: bool = False
 
-def detect_basic_pii(text):
-    """Basic PII detection including Singapore names and phone numbers"""
-    entities = []
-    
-    # Email detection
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    for match in re.finditer(email_pattern, text):
-        entities.append({
-            "start": match.start(),
-            "end": match.end(),
-            "entity_group": "EMAIL",
-            "confidence": 0.9
-        })
-    
-    # Comprehensive Singapore phone number patterns
-    phone_patterns = [
-        # Singapore mobile numbers (8/9 prefix)
-        r'\b[89]\d{7}\b',  # 8-digit mobile: 92124222, 81234567
-        r'\b[89]\d{3}[-\s]\d{4}\b',  # With separator: 9212-4222, 8123 4567
-        
-        # Singapore landline numbers (6 prefix)
-        r'\b6\d{7}\b',  # 8-digit landline: 61234567
-        r'\b6\d{3}[-\s]\d{4}\b',  # With separator: 6123-4567, 6123 4567
-        
-        # With Singapore country code (+65)
-        r'\+65[-\s]?[689]\d{3}[-\s]?\d{4}\b',  # +65-6123-4567, +65 9212 4222
-        r'\+65[-\s]?\d{8}\b',  # +65-92124222, +65 61234567
-        
-        # Parentheses format
-        r'\(\+65\)[-\s]?[689]\d{3}[-\s]?\d{4}\b',  # (+65) 9212-4222
-        r'\b\([89]\d{3}\)[-\s]?\d{4}\b',  # (9212) 4222
-        
-        # International format variations  
-        r'\b65[-\s][689]\d{3}[-\s]\d{4}\b',  # 65-9212-4222, 65 6123 4567
-        
-        # Toll-free and special numbers
-        r'\b1800[-\s]?\d{3}[-\s]?\d{4}\b',  # 1800-123-4567 (toll-free)
-        r'\b800[-\s]?\d{3}[-\s]?\d{4}\b',  # 800-123-4567
-        
-        # With extension
-        r'\b[689]\d{7}[-\s]?(?:ext|extension|x)[-\s]?\d{2,4}\b'  # 61234567 ext 123
-    ]
-    
-    for pattern in phone_patterns:
-        for match in re.finditer(pattern, text):
-            entities.append({
-                "start": match.start(),
-                "end": match.end(),
-                "entity_group": "PHONE",
-                "confidence": 0.8
-            })
-    
-    # Singapore name patterns with surname recognition
-    singapore_surnames = [
-        # Most common Chinese surnames in Singapore
-        'tan', 'lim', 'lee', 'ng', 'ong', 'wong', 'goh', 'teo', 'lau', 'sia',
-        'chan', 'chen', 'chong', 'chua', 'gan', 'ho', 'koh', 'low', 'neo', 'seah',
-        'soh', 'tay', 'toh', 'wee', 'yap', 'yeo', 'yeoh', 'yong', 'yu', 'chin',
-        'chew', 'foo', 'heng', 'hong', 'hoo', 'koo', 'lam', 'leong', 'loo', 'mok',
-        'sim', 'sng', 'soo', 'thong', 'tong', 'wang', 'woo', 'yak', 'yam', 'yang',
-        # Additional common Chinese given names also used as surnames
-        'li', 'wei', 'ming', 'jun', 'jie', 'hui', 'bin', 'han', 'yang', 'xin',
-        # Common Malay surnames
-        'ahmad', 'hassan', 'ibrahim', 'ismail', 'mohamed', 'mohammad', 'rahman', 'ali',
-        'omar', 'osman', 'salleh', 'abdullah', 'adam', 'hamid', 'hussain', 'rashid',
-        # Common Indian surnames
-        'singh', 'kumar', 'raj', 'rajan', 'krishnan', 'murugan', 'nathan', 'ravi',
-        'samy', 'devi', 'lakshmanan', 'suresh', 'prakash', 'menon', 'nair', 'pillai',
-        # Common Western surnames in Singapore
-        'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis'
-    ]
-    
-    name_patterns = [
-        # Names after "I'm" or "I am" - capture group extracts just the name (case-insensitive)
-        (r'(?:I\'m|I am)\s+([A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12}){0,3})', True),
-        # Names after "My name is" - capture group extracts just the name (case-insensitive), stop before "and"
-        (r'(?:my name is|name is)\s+([A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12})*?)(?=\s+and|\s+or|$|\.|,)', True),
-        # Names after greetings - capture group extracts just the name (2-4 parts)
-        (r'(?:Hi|Hello|Hey|Meet)\s+([A-Z][a-z]{1,12}\s+[A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12})?(?:\s+[A-Z][a-z]{1,12})?)', True),
-        # Names starting with Singapore surnames (case-insensitive) - capture full name
-        (r'\b((?:' + '|'.join([s.capitalize() for s in singapore_surnames]) + r')\s+[A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12})?)\b', True),
-        # Standalone names with proper capitalization and Singapore context
-        (r'\b[A-Z][a-z]{1,12}\s+(?:' + '|'.join([s.capitalize() for s in singapore_surnames]) + r')\b', False)
-    ]
-    
-    for pattern_data in name_patterns:
-        pattern, has_capture_group = pattern_data
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            # Get the name part (might be in capture group)
-            if has_capture_group and match.groups() and match.group(1):
-                name_text = match.group(1)
-                start_pos = match.start(1)
-                end_pos = match.end(1)
-            else:
-                name_text = match.group(0)
-                start_pos = match.start()
-                end_pos = match.end()
-            
-            # Comprehensive false positive filtering
-            name_lower = name_text.lower().strip()
-            false_positives = [
-                # Common phrases
-                'thank you', 'good morning', 'good afternoon', 'good evening', 'good night',
-                'how are', 'nice to', 'see you', 'talk to', 'speak to', 'email me',
-                'phone number', 'mobile number', 'contact number', 'telephone number',
-                'user name', 'full name', 'first name', 'last name', 'display name',
-                'company name', 'business name', 'file name', 'folder name',
-                # Geographic locations
-                'united states', 'new york', 'hong kong', 'kuala lumpur', 'penang',
-                'johor bahru', 'singapore city', 'orchard road', 'marina bay',
-                # Time and date related
-                'today', 'tomorrow', 'yesterday', 'monday', 'tuesday', 'wednesday', 
-                'thursday', 'friday', 'saturday', 'sunday', 'january', 'february',
-                'march', 'april', 'june', 'july', 'august', 'september', 'october',
-                'november', 'december', 'morning', 'afternoon', 'evening', 'night',
-                # Common words and fillers
-                'the', 'and', 'but', 'for', 'with', 'you', 'are', 'can', 'will', 'have',
-                'this', 'that', 'what', 'when', 'where', 'why', 'how', 'who', 'which',
-                'would', 'could', 'should', 'might', 'must', 'shall', 'may', 'need',
-                'make', 'take', 'give', 'tell', 'ask', 'work', 'play', 'help', 'want',
-                'about', 'from', 'they', 'them', 'were', 'been', 'said', 'each', 'she',
-                'their', 'time', 'very', 'after', 'first', 'well', 'year', 'name',
-                # Technology and business terms
-                'email', 'password', 'account', 'login', 'logout', 'signin', 'signup',
-                'website', 'internet', 'google', 'facebook', 'twitter', 'instagram',
-                'whatsapp', 'telegram', 'linkedin', 'youtube', 'microsoft', 'apple',
-                # Singapore context that aren't names
-                'singapore', 'nric', 'passport', 'address', 'postal code', 'zip code',
-                'street', 'road', 'avenue', 'lane', 'block', 'unit', 'floor'
-            ]
-            
-            # More flexible validation for Singapore names
-            is_valid_name = (
-                len(name_lower) >= 3 and  # At least 3 characters
-                not any(fp == name_lower for fp in false_positives) and  # Exact match check (not contains)
-                not name_text.isdigit() and
-                name_text.replace(' ', '').isalpha() and  # Only alphabetic characters and spaces
-                (' ' in name_text or len(name_text.split()) == 1) and  # Single names OK for contextual matches
-                len(name_text.split()) >= 1 and  # Must have at least 1 part  
-                len(name_text.split()) <= 4  # Maximum 4 parts
-            )
-            
-            
-            # Check for common non-name patterns but be less strict
-            if is_valid_name:
-                name_parts = name_text.split()
-                for part in name_parts:
-                    # Each part must be 1-15 characters (more flexible)
-                    if len(part) < 1 or len(part) > 15:
-                        is_valid_name = False
-                        break
-                
-                # Check if it's likely a person name vs. common phrase
-                likely_name_indicators = [
-                    # Has common Singapore surnames as exact word match
-                    any(surname == part.lower() for surname in singapore_surnames for part in name_parts),
-                    # Proper capitalization pattern
-                    all(part[0].isupper() for part in name_parts if len(part) > 0),
-                    # Not all parts are common English words
-                    not all(part.lower() in ['the', 'and', 'of', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this', 'with', 'you', 'it', 'not', 'or', 'be', 'are', 'was', 'born', 'my', 'name', 'phone', 'number', 'email', 'address'] for part in name_parts)
-                ]
-                
-                # If it doesn't have any indicators, be more strict about false positives
-                if not any(likely_name_indicators):
-                    # More comprehensive false positive check for non-obvious names
-                    extended_false_positives = [
-                        'phone number', 'mobile number', 'email address', 'today tomorrow',
-                        'good morning', 'thank you', 'how are', 'see you', 'talk to'
-                    ]
-                    if any(fp in name_lower for fp in extended_false_positives):
-                        is_valid_name = False
-            
-            if is_valid_name:
-                entities.append({
-                    "start": start_pos,
-                    "end": end_pos,
-                    "entity_group": "PERSON",
-                    "confidence": 0.8 if ' ' in name_text else 0.6  # Lower confidence for single names
-                })
-    
-    # Comprehensive PII patterns (Singapore-focused)
-    
-    # Singapore NRIC (National Registration Identity Card)
-    nric_patterns = [
-        r'\b[STFG]\d{7}[A-Z]\b',  # Standard Singapore NRIC format (S1234567A)
-        r'\b[stfg]\d{7}[a-z]\b',  # Lowercase version
-        r'\b[STFGstfg]\d{7}[A-Za-z]\b'  # Mixed case
-    ]
-    for pattern in nric_patterns:
-        for match in re.finditer(pattern, text):
-            entities.append({
-                "start": match.start(),
-                "end": match.end(),
-                "entity_group": "NRIC",
-                "confidence": 0.95
-            })
-    
-    # Comprehensive credit card patterns
-    credit_card_patterns = [
-        # Visa (starts with 4, 16 digits)
-        r'\b4\d{3}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 4123-4567-8901-2345
-        r'\b4\d{15}\b',  # 4123456789012345 (no separators)
-        
-        # Mastercard (starts with 5, 16 digits)
-        r'\b5[1-5]\d{2}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 5123-4567-8901-2345
-        r'\b5[1-5]\d{14}\b',  # 5123456789012345
-        
-        # American Express (starts with 34/37, 15 digits)
-        r'\b3[47]\d{2}[-\s]?\d{6}[-\s]?\d{5}\b',  # 3712-345678-90123
-        r'\b3[47]\d{13}\b',  # 371234567890123
-        
-        # Discover (starts with 6, 16 digits)
-        r'\b6(?:011|5\d{2})[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 6011-1234-5678-9012
-        r'\b6(?:011|5\d{2})\d{12}\b',  # 6011123456789012
-        
-        # Generic patterns (various lengths)
-        r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 16-digit with separators
-        r'\b\d{4}[-\s]?\d{6}[-\s]?\d{5}\b',  # 15-digit with separators
-        r'\b\d{16}\b',  # 16 consecutive digits
-        r'\b\d{15}\b',  # 15 consecutive digits
-        
-        # With dots as separators
-        r'\b\d{4}\.\d{4}\.\d{4}\.\d{4}\b',  # 4123.4567.8901.2345
-        r'\b\d{4}\.\d{6}\.\d{5}\b'  # 3712.345678.90123
-    ]
-    for pattern in credit_card_patterns:
-        for match in re.finditer(pattern, text):
-            entities.append({
-                "start": match.start(),
-                "end": match.end(),
-                "entity_group": "CREDIT_CARD",
-                "confidence": 0.9
-            })
-    
-    # Singapore Driver's License Numbers
-    license_patterns = [
-        r'\b[A-Z]\d{7,8}[A-Z]?\b',  # Singapore format similar to NRIC but for licenses
-        r'\bSPDL\d{6,8}\b'  # Singapore Police Driving License format (if applicable)
-    ]
-    for pattern in license_patterns:
-        for match in re.finditer(pattern, text):
-            # Additional context check for driver's license
-            context_before = text[max(0, match.start()-25):match.start()].lower()
-            context_after = text[match.end():match.end()+25].lower()
-            if any(term in context_before + context_after for term in ['license', 'licence', 'dl', 'driver', 'driving', 'singapore']):
-                entities.append({
-                    "start": match.start(),
-                    "end": match.end(),
-                    "entity_group": "DRIVER_LICENSE",
-                    "confidence": 0.85
-                })
-    
-    # Bank Account Numbers
-    bank_patterns = [
-        r'\b\d{8,17}\b',  # 8-17 digit account numbers
-        r'\b\d{4}[-\s]\d{4}[-\s]\d{4}[-\s]\d{4,8}\b'  # Formatted account numbers
-    ]
-    for pattern in bank_patterns:
-        for match in re.finditer(pattern, text):
-            context_before = text[max(0, match.start()-30):match.start()].lower()
-            context_after = text[match.end():match.end()+30].lower()
-            if any(term in context_before + context_after for term in ['account', 'bank', 'routing', 'iban']):
-                entities.append({
-                    "start": match.start(),
-                    "end": match.end(),
-                    "entity_group": "BANK_ACCOUNT",
-                    "confidence": 0.8
-                })
-    
-    # Comprehensive Singapore address patterns
-    address_patterns = [
-        # Singapore street addresses with various formats
-        r'\b\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{2,50}\s+(Road|Rd|Street|St|Avenue|Ave|Drive|Dr|Lane|Ln|Close|Crescent|Walk|Park|Gardens?|Heights?|View|Terrace|Place|Plaza|Way|Circuit|Link|Grove)\b',
-        
-        # HDB block addresses - various formats
-        r'\b(?:Blk|Block)\s+\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{3,50}(?:\s+(?:Street|St|Road|Rd|Avenue|Ave|Lane|Ln|Drive|Dr|Close|Crescent|Walk))?\b',
-        r'\b(?:Block|Blk)\.?\s+\d{1,4}[A-Z]?,?\s+[A-Za-z0-9\s,]{5,60}\b',
-        
-        # With unit numbers - various formats
-        r'\b\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{2,40}\s+(?:Road|Rd|Street|St|Avenue|Ave|Drive|Dr)\s*[,]?\s*#\d{2}-\d{2,4}\b',
-        r'\b\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{2,40}\s+(?:Road|Rd|Street|St|Avenue|Ave)\s*[,]?\s*(?:Unit|Apt|Apartment)\s*\d{1,4}[-]?\d{0,4}\b',
-        r'\b\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{2,40}\s+(?:Road|Rd|Street|St|Avenue|Ave)\s*[,]?\s*Level\s*\d{1,3}\b',
-        
-        # Shopping centers and buildings
-        r'\b[A-Za-z0-9\s]{3,40}\s+(?:Shopping Centre|Shopping Center|Mall|Tower|Building|Complex|Plaza|Centre|Center)\b',
-        r'\b\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{3,40}\s+(?:Building|Tower|Centre|Center|Complex)\b',
-        
-        # Condominium and private housing
-        r'\b[A-Za-z0-9\s]{3,50}\s+(?:Condominium|Condo|Residences?|Court|Manor|Villa|Estate)\b',
-        
-        # PO Box variations
-        r'\b(?:P\.?O\.?\s*Box|Post\s+Office\s+Box|POB)\s+\d{1,6}\b',
-        
-        # Singapore iconic locations
-        r'\b\d{1,4}[A-Z]?\s+(?:Marina\s+Bay\s+Sands|Raffles\s+Place|Orchard\s+Road|Sentosa|Clarke\s+Quay|Boat\s+Quay|Chinatown|Little\s+India)\b',
-        
-        # General format with comma separation
-        r'\b\d{1,4}[A-Z]?\s+[A-Za-z0-9\s]{5,50},\s+[A-Za-z\s]{3,30},?\s+Singapore\b'
-    ]
-    for pattern in address_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            entities.append({
-                "start": match.start(),
-                "end": match.end(),
-                "entity_group": "ADDRESS",
-                "confidence": 0.85
-            })
-    
-    # Singapore postal codes (6-digit format)
-    postal_patterns = [
-        r'\b\d{6}\b',  # Singapore postal codes (098765)
-        r'\bSingapore\s+\d{6}\b'  # "Singapore 098765" format
-    ]
-    for pattern in postal_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            # For Singapore, be more lenient with postal code detection
-            postal_code = match.group(0)
-            if 'Singapore' in postal_code:
-                # Extract just the 6-digit code
-                digits_match = re.search(r'\d{6}', postal_code)
-                if digits_match:
-                    start_pos = match.start() + digits_match.start()
-                    end_pos = match.start() + digits_match.end()
-                else:
-                    start_pos = match.start()
-                    end_pos = match.end()
-            else:
-                # Context check for standalone 6-digit numbers
-                context_before = text[max(0, match.start()-25):match.start()].lower()
-                context_after = text[match.end():match.end()+25].lower()
-                context_indicators = ['postal', 'code', 'singapore', 'address', 'zip']
-                if not any(term in context_before + context_after for term in context_indicators):
-                    continue  # Skip if no context indicators
-                start_pos = match.start()
-                end_pos = match.end()
-            
-            entities.append({
-                "start": start_pos,
-                "end": end_pos,
-                "entity_group": "POSTAL_CODE",
-                "confidence": 0.85
-            })
-    
-    # Comprehensive date patterns for birth dates
-    dob_patterns = [
-        # Numeric formats
-        r'\b\d{1,2}/\d{1,2}/\d{4}\b',  # DD/MM/YYYY or MM/DD/YYYY
-        r'\b\d{1,2}-\d{1,2}-\d{4}\b',  # DD-MM-YYYY or MM-DD-YYYY
-        r'\b\d{4}/\d{1,2}/\d{1,2}\b',  # YYYY/MM/DD
-        r'\b\d{4}-\d{1,2}-\d{1,2}\b',  # YYYY-MM-DD
-        r'\b\d{1,2}\.\d{1,2}\.\d{4}\b',  # DD.MM.YYYY
-        
-        # Written month formats (full names)
-        r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',  # January 15, 1990
-        r'\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\b',  # 15 January 1990
-        
-        # Abbreviated month formats
-        r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\.?\s+\d{1,2},?\s+\d{4}\b',  # Jan 15, 1990 or Jan. 15, 1990
-        r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\.?\s+\d{4}\b',  # 15 Jan 1990 or 15 Jan. 1990
-        
-        # Ordinal date formats
-        r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th),?\s+\d{4}\b',  # January 1st, 1990
-        r'\b\d{1,2}(?:st|nd|rd|th)\s+(?:of\s+)?(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\b',  # 1st of January 1990
-        
-        # Casual date formats
-        r'\b(?:born\s+(?:on\s+)?)(\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4})\b',  # born on 1 January 1990
-        r'\b(?:birthday\s+(?:is\s+)?(?:on\s+)?)(\d{1,2}/\d{1,2}/\d{4})\b'  # birthday is on 01/01/1990
-    ]
-    for pattern in dob_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            context_before = text[max(0, match.start()-30):match.start()].lower()
-            context_after = text[match.end():match.end()+30].lower()
-            if any(term in context_before + context_after for term in ['birth', 'born', 'dob', 'birthday']):
-                entities.append({
-                    "start": match.start(),
-                    "end": match.end(),
-                    "entity_group": "DATE_OF_BIRTH",
-                    "confidence": 0.85
-                })
-    
-    # Singapore Work Pass and Foreign ID Numbers
-    foreign_id_patterns = [
-        r'\b[FGM]\d{7}[A-Z]\b',  # Foreign ID in Singapore (F1234567A, G1234567B, M1234567C)
-        r'\bWP\d{8}\b',  # Work Permit numbers
-        r'\bEP\d{8}\b',  # Employment Pass numbers
-        r'\bDP\d{8}\b'   # Dependant Pass numbers
-    ]
-    for pattern in foreign_id_patterns:
-        for match in re.finditer(pattern, text):
-            context_before = text[max(0, match.start()-25):match.start()].lower()
-            context_after = text[match.end():match.end()+25].lower()
-            if any(term in context_before + context_after for term in ['id', 'identity', 'card', 'work', 'permit', 'pass', 'employment', 'singapore']):
-                entities.append({
-                    "start": match.start(),
-                    "end": match.end(),
-                    "entity_group": "WORK_PASS",
-                    "confidence": 0.85
-                })
-    
-    # Tax Numbers
-    tax_patterns = [
-        r'\b\d{2}-\d{7}\b',  # EIN format
-        r'\b\d{3}-\d{2}-\d{4}\b'  # Also catches SSN used as tax ID
-    ]
-    for pattern in tax_patterns:
-        for match in re.finditer(pattern, text):
-            context_before = text[max(0, match.start()-20):match.start()].lower()
-            context_after = text[match.end():match.end()+20].lower()
-            if any(term in context_before + context_after for term in ['tax', 'ein', 'itin']):
-                entities.append({
-                    "start": match.start(),
-                    "end": match.end(),
-                    "entity_group": "TAX_NUMBER",
-                    "confidence": 0.85
-                })
-    
-    # Passwords (basic patterns - look for context)
-    password_patterns = [
-        r'(?:password|pwd|pass)\s*[:=]\s*([A-Za-z0-9@#$%^&*!]{6,})',
-        r'(?:password|pwd|pass)\s+is\s+([A-Za-z0-9@#$%^&*!]{6,})'
-    ]
-    for pattern in password_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            # Extract just the password part
-            password_text = match.group(1)
-            password_start = match.start(1)
-            password_end = match.end(1)
-            entities.append({
-                "start": password_start,
-                "end": password_end,
-                "entity_group": "PASSWORD",
-                "confidence": 0.9
-            })
-    
-    # Remove duplicate/overlapping entities (prefer longer, more specific matches)
-    entities.sort(key=lambda x: (-(x['end'] - x['start']), x['start']))  # Sort by length desc, then start pos
-    filtered_entities = []
-    for entity in entities:
-        # Check if this entity overlaps with any existing entity
-        overlaps = False
-        for existing in filtered_entities:
-            if (entity['start'] < existing['end'] and entity['end'] > existing['start']):
-                overlaps = True
-                break
-        if not overlaps:
-            filtered_entities.append(entity)
-    
-    # Final sort by position for consistent output
-    filtered_entities.sort(key=lambda x: x['start'])
-    
-    return filtered_entities
+class BatchRequest(BaseModel):
+    texts: List[str]
+    enabled_labels: Optional[Dict[str, bool]] = None
+
+class TextEdit(BaseModel):
+    offset: int
+    delete: int = 0
+    insert: str = ""
+
+class IncrementalRequest(BaseModel):
+    session_id: str
+    # Full text (re)starts the session; otherwise edit applies to its text
+    text: Optional[str] = None
+    edit: Optional[TextEdit] = None
+    # Session version the edit was made against, if the client tracks it
+    version: Optional[int] = None
+    # Labels to detect, fixed when text opens the session
+    enabled_labels: Optional[Dict[str, bool]] = None
 
-def replace_with_fake_data(results, text, enabled_labels=None):
-    """Replace detected entities with fake data only if enabled"""
+class LiveMessage(BaseModel):
+    # Echoed in the result so the client can match it to its text
+    seq: Optional[int] = None
+    # Full text (re)starts the live session; otherwise edit applies to its text
+    text: Optional[str] = None
+    edit: Optional[TextEdit] = None
+    enabled_labels: Optional[Dict[str, bool]] = None
+    pseudonym_scope: Optional[str] = None
+
+def regex_budget(text):
+    """Seconds regex detection may spend on text, or None for no limit"""
+    if REGEX_BUDGET_MS <= 0:
+        return None
+    return (REGEX_BUDGET_MS + REGEX_BUDGET_MS_PER_KB * len(text) / 1000) / 1000
+
+def detect_basic_pii(text, families=None):
+    """
+    Basic PII detection including Singapore names and phone numbers.
+    families limits it to those regex families (see labels.regex_families).
+    Returns (entities, timed_out); past the budget, entities are those found so far.
+    """
+    with STAGE_SECONDS.time("regex"):
+        try:
+            return basic_pii_detector.restricted(families).detect(text, regex_budget(text)), False
+        except RegexTimeout as e:
+            REGEX_TIMEOUTS.inc()
+            logger.warning(f"⚠️ {e} on {len(text)} characters, returning {len(e.entities)} entities found so far")
+            return e.entities, True
+
+def cached_basic_pii(text, families=None):
+    """detect_basic_pii through the shared detection cache"""
+    entities = detection_cache.get("regex", text, families)
+    if entities is not None:
+        return entities, False
+    entities, timed_out = detect_basic_pii(text, families)
+    # Partial results would hide the timeout from later requests
+    if not timed_out:
+        detection_cache.put("regex", text, entities, families)
+    return entities, timed_out
+
+async def detect_model_pii(text):
+    """
+    Piiranha entities for text in our standard format, through the cache.
+    The model only runs on the segments of text not in the segment cache.
+    """
+    entities = detection_cache.get("model", text)
+    if entities is not None:
+        return entities
+
+    if MODEL_SEGMENTS == "off":
+        entities = await run_model_pii(text)
+    else:
+        spans = segment_spans(text, MODEL_SEGMENTS)
+        found = {}
+        for start, end in spans:
+            segment = text[start:end]
+            if segment not in found:
+                found[segment] = segment_cache.get("model", segment)
+        missing = [segment for segment, entities in found.items() if entities is None]
+        # One batch of segments in flight at a time, as for windows below
+        for i in range(0, len(missing), BATCH_MAX_SIZE):
+            group = missing[i:i + BATCH_MAX_SIZE]
+            for segment, entities in zip(group, await asyncio.gather(*map(run_model_pii, group))):
+                found[segment] = entities
+                segment_cache.put("model", segment, entities)
+        entities = [e for start, end in spans for e in offset_entities(found[text[start:end]], start)]
+        if len(spans) > 1:
+            logger.debug(f"🧩 Ran Piiranha on {len(missing)} of {len(spans)} segments")
+
+    detection_cache.put("model", text, entities)
+    return entities
+
+async def run_model_pii(text):
+    """Piiranha entities for text, in windows when it is longer than the model input"""
+    # Every token covers at least one character, so short texts always fit
+    max_tokens = CHUNK_TOKENS or model_loader.max_tokens
+    windows = [(0, len(text))]
+    if len(text) > max_tokens // 2:
+        windows = await asyncio.to_thread(
+            token_windows, text, model_loader.window_tokenizer, max_tokens, CHUNK_OVERLAP
+        )
+
+    if len(windows) == 1:
+        entities = await model_batcher.submit(text)
+    else:
+        # One batch of windows in flight at a time keeps memory bounded by
+        # the batch size rather than the text length
+        window_entities = []
+        for i in range(0, len(windows), BATCH_MAX_SIZE):
+            group = windows[i:i + BATCH_MAX_SIZE]
+            results = await asyncio.gather(*(model_batcher.submit(text[start:end]) for start, end in group))
+            window_entities.extend(results)
+        entities = merge_window_entities(windows, window_entities)
+        logger.debug(f"🧩 Ran Piiranha over {len(windows)} windows of {len(text)} characters")
+    return entities
+
+def replace_with_fake_data(results, text, enabled_labels=None, scope=""):
+    """Replace detected entities with consistent fake data only if enabled"""
     if enabled_labels is None:
         enabled_labels = {}  
 
-    anonymized_text = text
+    started = time.perf_counter()
+    replacements = []
     results_sorted = sorted(results, key=lambda x: x["start"], reverse=True)
 
     for item in results_sorted:
@@ -505,121 +458,695 @@ def replace_with_fake_data(results, text, enabled_labels=None):
 
         start, end = item["start"], item["end"]
 
-        if entity_type == "EMAIL":
-            replacement = faker.email()
-        elif entity_type == "PHONE":
-            replacement = faker.phone_number()
-        elif entity_type == "PERSON":
-            replacement = faker.name()
-        elif entity_type == "SSN":
-            replacement = faker.ssn()
-        else:
+        replacement = pseudonymizer.fake(entity_type, text[start:end], scope)
+        if replacement is None:
             replacement = f"[{entity_type}]"
 
-        anonymized_text = anonymized_text[:start] + replacement + anonymized_text[end:]
+        replacements.append((start, end, replacement))
         item["replacement"] = replacement
 
+    anonymized_text = rewrite(text, replacements)
+    STAGE_SECONDS.observe(time.perf_counter() - started, "rewrite")
     return anonymized_text, results
 
 
+def compact_result(request, accept, entities, rewritten, columns=COLUMNS, **fields):
+    """
+    Compact response body: entities as columns (see responses.columnar),
+    fields, and anonymized_text only when the request asks for it. rewritten
+    returns that text, so it is not built when nobody reads it.
+    """
+    if wants_msgpack(accept) and not msgpack_available():
+        raise HTTPException(status_code=406, detail="MessagePack responses need the msgpack package")
+    content = {"entities": columnar(entities, columns)}
+    if request.include_text:
+        content["anonymized_text"] = rewritten()
+    content.update(fields)
+    return compact_response(content, accept)
+
 @app.post("/replace_with_fake")
-async def replace_with_fake(request: TextRequest):
+async def replace_with_fake(request: TextRequest, http_request: Request):
     text = request.text
     enabled_labels = request.enabled_labels 
-    results = detect_basic_pii(text)
+    results, regex_timeout = cached_basic_pii(text, regex_families(enabled_labels))
+    observe_detection("/replace_with_fake", text, results)
 
     anonymized_text, updated_entities = replace_with_fake_data(
-        results, text, enabled_labels
+        results, text, enabled_labels, request.pseudonym_scope or ""
     )
 
+    if request.compact:
+        return compact_result(request, http_request.headers.get("accept"), updated_entities,
+                              lambda: anonymized_text, COLUMNS + ("replacement",),
+                              regex_timeout=regex_timeout)
     return {
         "anonymized_text": anonymized_text,
         "entities": updated_entities,
-        "original_text": text
+        "original_text": text,
+        "regex_timeout": regex_timeout
     }
 
 
 
+async def model_pii_or_fallback(text):
+    """
+    Piiranha entities for text as (entities, degraded). Model failures yield
+    no entities so callers fall back to regex-only detection.
+    """
+    if not model_loader.ready:
+        model_loader.start()
+        DEGRADED.inc("loading")
+        logger.debug(f"⏳ Piiranha model {model_loader.state}, serving regex-only detection")
+        return [], True
+
+    try:
+        with STAGE_SECONDS.time("model"):
+            return await detect_model_pii(text), False
+    except InferenceBusy as e:
+        DEGRADED.inc("busy")
+        if MODEL_OVERLOAD_POLICY == "reject":
+            raise HTTPException(status_code=429, detail="PII model is busy, retry shortly",
+                                headers={"Retry-After": "1"})
+        logger.warning(f"⚠️ Piiranha model busy ({e}), serving regex-only detection")
+        return [], True
+    except InferenceTimeout as e:
+        DEGRADED.inc("timeout")
+        logger.warning(f"⚠️ Piiranha model timed out ({e}), serving regex-only detection")
+        return [], True
+    except Exception as e:
+        DEGRADED.inc("error")
+        logger.error(f"❌ Piiranha model failed: {e}")
+        logger.info("🔄 Falling back to regex-only detection")
+        return [], False
+
+async def planned_model_pii(text, enabled_labels=None):
+    """
+    model_pii_or_fallback limited to enabled_labels: entities of disabled
+    groups are dropped, and the model is skipped when none of its labels is on.
+    """
+    if not model_enabled(enabled_labels):
+        return [], False
+    entities, degraded = await model_pii_or_fallback(text)
+    return filter_entities(entities, enabled_labels), degraded
+
+async def audit_skipped(text, regex_entities, enabled_labels):
+    """Run the model on a text the cascade skipped and count what regex missed"""
+    try:
+        entities = filter_entities(await detect_model_pii(text), enabled_labels)
+    except Exception as e:
+        logger.debug(f"Cascade audit dropped: {e}")
+        return
+    missed = cascade.record_audit(entities, regex_entities)
+    if missed:
+        log_sampled(f"🔎 Cascade audit: model found {missed} entities regex missed in a skipped text")
+
+async def cascaded_model_pii(text, regex_entities, enabled_labels=None, complete=True):
+    """
+    planned_model_pii unless the cascade decides regex_entities already
+    account for text; skipped texts are not degraded.
+    """
+    if not model_enabled(enabled_labels):
+        return [], False
+    if cascade.decide(text, regex_entities, complete) is not None:
+        if model_loader.ready and CASCADE_AUDIT_RATE and random.random() < CASCADE_AUDIT_RATE:
+            task = asyncio.create_task(audit_skipped(text, regex_entities, enabled_labels))
+            cascade_audits.add(task)
+            task.add_done_callback(cascade_audits.discard)
+        return [], False
+    entities, degraded = await planned_model_pii(text, enabled_labels)
+    if not degraded:
+        cascade.record_model(entities)
+    return entities, degraded
+
+def merge_entities(model_entities, regex_entities):
+    """
+    Combine model and regex entities under MERGE_POLICY.
+    Returns the merged list sorted by position and the number of regex entities added.
+    """
+    with STAGE_SECONDS.time("merge"):
+        return merge_spans(model_entities, regex_entities, MERGE_POLICY)
+
+def anonymize_with_placeholders(text, entities):
+    """Replace every entity span with an [ENTITY_GROUP] placeholder"""
+    with STAGE_SECONDS.time("rewrite"):
+        return rewrite(text, [
+            (item["start"], item["end"], f"[{item['entity_group'].upper()}]") for item in entities
+        ])
+
 @app.post("/detect_pii")
-async def detect_pii(request: TextRequest):
+async def detect_pii(request: TextRequest, http_request: Request):
     """
-    PII detection endpoint using Piiranha model first, then regex fallback.
+    PII detection endpoint using the Piiranha model and regex detection.
+    Regex runs first so the cascade can skip the model on texts it covers.
     Returns detected entities with anonymized text.
     """
     text = request.text
     original_text = text
-    all_entities = []
-    piiranha_entities = 0
     regex_entities = 0
-    
-    try:
-        # Primary: Use Piiranha model for PII detection
-        logger.info("🔍 Using Piiranha model for primary PII detection")
-        piiranha_results = pii_detector(text)
-        
-        # Convert Piiranha results to our standard format
-        for item in piiranha_results:
-            all_entities.append({
-                "start": int(item["start"]),
-                "end": int(item["end"]), 
-                "entity_group": str(item["entity_group"]).upper(),
-                "confidence": float(item.get("score", 0.9))
-            })
-        
-        piiranha_entities = len(piiranha_results)
-        logger.info(f"✅ Piiranha model found {piiranha_entities} PII entities")
-            
-    except Exception as e:
-        logger.error(f"❌ Piiranha model failed: {e}")
-        logger.info("🔄 Falling back to regex-only detection")
-    
-    # Fallback: Use regex detection for additional coverage
+    regex_timeout = False
+    regex_results = None
+
     try:
-        logger.info("🔍 Using regex detection for additional coverage")
-        regex_results = detect_basic_pii(text)
-        
-        # Merge results, avoiding duplicates by checking overlap
-        regex_added = 0
-        for regex_entity in regex_results:
-            overlaps = False
-            for existing in all_entities:
-                if (regex_entity['start'] < existing['end'] and 
-                    regex_entity['end'] > existing['start']):
-                    overlaps = True
-                    break
-            if not overlaps:
-                all_entities.append(regex_entity)
-                regex_added += 1
-        
-        regex_entities = regex_added
-        logger.info(f"✅ Regex detection added {regex_entities} additional PII entities")
-                
+        logger.debug("🔍 Using regex detection")
+        regex_results, regex_timeout = cached_basic_pii(text, regex_families(request.enabled_labels))
     except Exception as e:
         logger.error(f"❌ Regex detection failed: {e}")
+
+    # Without regex results the cascade has nothing to vouch for the text
+    logger.debug("🔍 Using Piiranha model for PII detection")
+    all_entities, degraded = await cascaded_model_pii(text, regex_results or [], request.enabled_labels,
+                                                      complete=regex_results is not None and not regex_timeout)
+    piiranha_entities = len(all_entities)
+    logger.debug(f"✅ Piiranha model found {piiranha_entities} PII entities")
+
+    if regex_results is not None:
+        # Merge results, avoiding duplicates by checking overlap
+        all_entities, regex_entities = merge_entities(all_entities, regex_results)
+        logger.debug(f"✅ Regex detection added {regex_entities} additional PII entities")
     
     # Log final detection summary
     total_entities = len(all_entities)
-    logger.info(f"📊 Detection Summary: {total_entities} total entities (Piiranha: {piiranha_entities}, Regex: {regex_entities})")
-    
-    # Sort entities by position
-    all_entities.sort(key=lambda x: x['start'])
-    
-    # Create anonymized text
-    anonymized_text = original_text
-    entities_sorted = sorted(all_entities, key=lambda x: x["start"], reverse=True)
-    
-    for item in entities_sorted:
-        start, end = item["start"], item["end"]
-        entity = item["entity_group"].upper()
-        anonymized_text = anonymized_text[:start] + f"[{entity}]" + anonymized_text[end:]
-    
+    log_sampled(f"📊 Detection Summary: {total_entities} total entities (Piiranha: {piiranha_entities}, Regex: {regex_entities})")
+    observe_detection("/detect_pii", text, all_entities)
+
+    if request.compact:
+        return compact_result(request, http_request.headers.get("accept"), all_entities,
+                              lambda: anonymize_with_placeholders(text, all_entities),
+                              degraded=degraded, regex_timeout=regex_timeout)
     return {
-        "anonymized_text": anonymized_text,
+        "anonymized_text": anonymize_with_placeholders(original_text, all_entities),
         "entities": all_entities,
-        "original_text": original_text
+        "original_text": original_text,
+        "degraded": degraded,
+        "regex_timeout": regex_timeout
     }
 
+def offset_entities(entities, offset):
+    """Entities detected in an excerpt, moved to offsets of the full text"""
+    return [dict(e, start=e["start"] + offset, end=e["end"] + offset) for e in entities]
+
+@app.post("/detect_pii/incremental")
+async def detect_pii_incremental(request: IncrementalRequest):
+    """
+    Incremental PII detection for a text edited in place. Send the full text
+    once to open a session, then edits (offset, deleted length, inserted text)
+    against it. Only the sentences around an edit are re-detected by regex and
+    Piiranha; entities elsewhere are kept with shifted offsets.
+    """
+    window = None
+    if request.text is not None:
+        text = request.text
+        model_entities, degraded = await planned_model_pii(text, request.enabled_labels)
+        regex_entities, regex_timeout = cached_basic_pii(text, regex_families(request.enabled_labels))
+        session = DetectionSession(text, regex_entities, model_entities, model_stale=degraded,
+                                   enabled_labels=request.enabled_labels)
+        incremental_sessions.put(request.session_id, session)
+    elif request.edit is None:
+        raise HTTPException(status_code=422, detail="Either text or edit is required")
+    else:
+        session = incremental_sessions.get(request.session_id)
+        if session is None:
+            raise HTTPException(status_code=409, detail="Unknown or expired session, resend the full text")
+
+        async with session.lock:
+            if request.version is not None and request.version != session.version:
+                raise HTTPException(status_code=409,
+                                    detail=f"Edit is against version {request.version}, session is at {session.version}")
+            edit = request.edit
+            try:
+                text = apply_edit(session.text, edit.offset, edit.delete, edit.insert)
+            except EditError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            delta = len(edit.insert) - edit.delete
+
+            # Re-detect the sentences around the edit, with some context on
+            # either side so patterns relying on nearby keywords still fire
+            window = edit_window(text, edit.offset, edit.offset + len(edit.insert), INCREMENTAL_RADIUS)
+            slice_start, slice_end = context_slice(text, *window)
+            excerpt = text[slice_start:slice_end]
+
+            fresh, regex_timeout = cached_basic_pii(excerpt, regex_families(session.enabled_labels))
+            regex_entities = splice_entities(
+                shift_entities(session.regex_entities, edit.offset, edit.delete, delta),
+                window,
+                offset_entities(fresh, slice_start)
+            )
+            if session.model_stale:
+                model_entities, degraded = await planned_model_pii(text, session.enabled_labels)
+            else:
+                fresh, degraded = await planned_model_pii(excerpt, session.enabled_labels)
+                model_entities = splice_entities(
+                    shift_entities(session.model_entities, edit.offset, edit.delete, delta),
+                    window,
+                    offset_entities(fresh, slice_start)
+                )
+
+            session.text = text
+            session.regex_entities = regex_entities
+            session.model_entities = model_entities
+            session.model_stale = degraded
+            session.version += 1
+
+    all_entities, _ = merge_entities(session.model_entities, session.regex_entities)
+    return {
+        "session_id": request.session_id,
+        "version": session.version,
+        "anonymized_text": anonymize_with_placeholders(session.text, all_entities),
+        "entities": all_entities,
+        "window": list(window) if window else None,
+        "degraded": degraded,
+        "regex_timeout": regex_timeout
+    }
+
+@app.websocket("/ws/detect")
+async def detect_pii_live(websocket: WebSocket):
+    """
+    Live-typing detection over one connection per input box. The client
+    sends JSON messages: {"text": ...} (re)starts the text, {"edit": {...}}
+    changes it like /detect_pii/incremental, and both may carry a "seq".
+    The server answers with one message holding what /detect_pii and
+    /replace_with_fake return, without echoing the text. Regex detection runs
+    as each message arrives; a model run still in flight when newer text
+    arrives is cancelled, so only the latest text gets an answer.
+    """
+    await websocket.accept()
+    live_connections.add(websocket)
+    session = None
+    scope = ""
+    regex_timeout = False
+    # Range of session.text edited since the model last ran, when it is not stale
+    unseen = None
+    detection = None
+
+    async def detect(seq):
+        nonlocal unseen
+        text = session.text
+        degraded = False
+        try:
+            if session.model_stale:
+                session.model_entities, degraded = await planned_model_pii(text, session.enabled_labels)
+            elif unseen is not None:
+                window = edit_window(text, *unseen, INCREMENTAL_RADIUS)
+                slice_start, slice_end = context_slice(text, *window)
+                fresh, degraded = await planned_model_pii(text[slice_start:slice_end], session.enabled_labels)
+                session.model_entities = splice_entities(session.model_entities, window,
+                                                         offset_entities(fresh, slice_start))
+        except HTTPException as e:
+            # PII_MODEL_OVERLOAD_POLICY=reject
+            await asyncio.shield(websocket.send_json({"type": "error", "seq": seq, "detail": e.detail}))
+            return
+        # Nothing awaited since the model answered, so no edit came in between
+        session.model_stale = degraded
+        unseen = None
+
+        all_entities, _ = merge_entities(session.model_entities, session.regex_entities)
+        fake_text, fake_entities = replace_with_fake_data(
+            [dict(e) for e in session.regex_entities], text, session.enabled_labels, scope
+        )
+        observe_detection("/ws/detect", text, all_entities)
+        await asyncio.shield(websocket.send_json({
+            "type": "result",
+            "seq": seq,
+            "version": session.version,
+            "anonymized_text": anonymize_with_placeholders(text, all_entities),
+            "entities": all_entities,
+            "fake_text": fake_text,
+            "fake_entities": fake_entities,
+            "degraded": degraded,
+            "regex_timeout": regex_timeout
+        }))
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            seq = None
+            try:
+                data = json.loads(raw)
+                if not isinstance(data, dict):
+                    raise ValueError("Messages must be JSON objects")
+                seq = data.get("seq")
+                message = LiveMessage(**data)
+                if message.text is not None:
+                    families = regex_families(message.enabled_labels)
+                    regex_entities, regex_timeout = cached_basic_pii(message.text, families)
+                    session = DetectionSession(message.text, regex_entities, [], model_stale=True,
+                                               enabled_labels=message.enabled_labels)
+                    scope = message.pseudonym_scope or ""
+                    unseen = None
+                elif message.edit is None:
+                    raise ValueError("Either text or edit is required")
+                elif session is None:
+                    raise ValueError("Send the full text before any edit")
+                else:
+                    edit = message.edit
+                    text = apply_edit(session.text, edit.offset, edit.delete, edit.insert)
+                    delta = len(edit.insert) - edit.delete
+                    window = edit_window(text, edit.offset, edit.offset + len(edit.insert), INCREMENTAL_RADIUS)
+                    slice_start, slice_end = context_slice(text, *window)
+                    fresh, timed_out = cached_basic_pii(text[slice_start:slice_end],
+                                                        regex_families(session.enabled_labels))
+                    session.regex_entities = splice_entities(
+                        shift_entities(session.regex_entities, edit.offset, edit.delete, delta),
+                        window,
+                        offset_entities(fresh, slice_start)
+                    )
+                    regex_timeout = regex_timeout or timed_out
+                    session.model_entities = shift_entities(session.model_entities, edit.offset, edit.delete, delta)
+                    unseen = cover_edit(unseen, edit.offset, edit.delete, edit.insert)
+                    session.text = text
+                    session.version += 1
+            except ValueError as e:
+                # Malformed JSON or message, or an edit that doesn't fit the text
+                await websocket.send_json({"type": "error", "seq": seq, "detail": str(e)})
+                continue
+
+            if detection is not None and not detection.done():
+                detection.cancel()
+                LIVE_SUPERSEDED.inc()
+            detection = asyncio.create_task(detect(message.seq))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_connections.discard(websocket)
+        if detection is not None:
+            detection.cancel()
+
+def model_pii_bulk(texts, run_model):
+    """
+    Piiranha entities for many texts as (entities per text, degraded per text).
+    Long texts are split into windows; all windows are sorted by length before
+    batching so each padded batch holds inputs of similar size.
+    """
+    max_tokens = CHUNK_TOKENS or model_loader.max_tokens
+    windows = [
+        token_windows(text, model_loader.window_tokenizer, max_tokens, CHUNK_OVERLAP)
+        if len(text) > max_tokens // 2 else [(0, len(text))]
+        for text in texts
+    ]
+    pieces = [(i, j) for i, text_windows in enumerate(windows) for j in range(len(text_windows))]
+    pieces.sort(key=lambda piece: windows[piece[0]][piece[1]][1] - windows[piece[0]][piece[1]][0])
+
+    window_entities = [[None] * len(text_windows) for text_windows in windows]
+    degraded = [False] * len(texts)
+    for b in range(0, len(pieces), BULK_BATCH_SIZE):
+        batch = pieces[b:b + BULK_BATCH_SIZE]
+        inputs = [texts[i][windows[i][j][0]:windows[i][j][1]] for i, j in batch]
+        try:
+            results = run_model(inputs)
+        except InferenceBusy:
+            if MODEL_OVERLOAD_POLICY == "reject":
+                raise
+            DEGRADED.inc("busy", amount=len(inputs))
+            results = None
+        except Exception as e:
+            logger.error(f"❌ Piiranha model failed on a batch of {len(inputs)}: {e}")
+            DEGRADED.inc("error", amount=len(inputs))
+            results = None
+        for k, (i, j) in enumerate(batch):
+            if results is None:
+                degraded[i] = True
+                window_entities[i][j] = []
+            else:
+                window_entities[i][j] = results[k]
+
+    entities = [
+        found[0] if len(found) == 1 else merge_window_entities(text_windows, found)
+        for text_windows, found in zip(windows, window_entities)
+    ]
+    return entities, degraded
+
+def model_pii_segmented(texts, run_model):
+    """
+    model_pii_bulk over the distinct segments of texts that are not in the
+    segment cache, reassembled per text. A text is degraded when any of its
+    segments is.
+    """
+    if MODEL_SEGMENTS == "off":
+        return model_pii_bulk(texts, run_model)
+    split = [segment_spans(text, MODEL_SEGMENTS) for text in texts]
+    found = {}
+    for text, spans in zip(texts, split):
+        for start, end in spans:
+            segment = text[start:end]
+            if segment not in found:
+                found[segment] = segment_cache.get("model", segment)
+    missing = [segment for segment, entities in found.items() if entities is None]
+    failed = set()
+    if missing:
+        for segment, entities, was_degraded in zip(missing, *model_pii_bulk(missing, run_model)):
+            found[segment] = entities
+            if was_degraded:
+                failed.add(segment)
+            else:
+                segment_cache.put("model", segment, entities)
+
+    entities, degraded = [], []
+    for text, spans in zip(texts, split):
+        entities.append([e for start, end in spans for e in offset_entities(found[text[start:end]], start)])
+        degraded.append(any(text[start:end] in failed for start, end in spans))
+    return entities, degraded
+
+def detect_batch(texts, run_model=None, enabled_labels=None):
+    """
+    Detect PII in many texts; the results are in input order and shaped like
+    /detect_pii responses without original_text. run_model takes a list of
+    texts and returns entities per text (see model_backend); without it, detection is regex-only.
+    Repeated texts are detected once, and the model only runs on texts the
+    cascade does not skip.
+    """
+    unique = list(dict.fromkeys(texts))
+    families = regex_families(enabled_labels)
+    regex_detected = [detect_basic_pii(text, families) for text in unique]
+    model_entities, degraded = [[] for _ in unique], [False] * len(unique)
+    if model_enabled(enabled_labels):
+        needed = [i for i, (text, (regex_found, timed_out)) in enumerate(zip(unique, regex_detected))
+                  if cascade.decide(text, regex_found, not timed_out) is None]
+        if run_model is None:
+            for i in needed:
+                degraded[i] = True
+            DEGRADED.inc("regex_only", amount=len(needed))
+        elif needed:
+            found, was_degraded = model_pii_segmented([unique[i] for i in needed], run_model)
+            for i, entities, d in zip(needed, found, was_degraded):
+                model_entities[i] = filter_entities(entities, enabled_labels)
+                degraded[i] = d
+                if not d:
+                    cascade.record_model(model_entities[i])
+
+    by_text = {}
+    for text, found, (regex_found, timed_out), was_degraded in zip(unique, model_entities, regex_detected, degraded):
+        entities, _ = merge_entities(found, regex_found)
+        by_text[text] = (anonymize_with_placeholders(text, entities), entities, was_degraded, timed_out)
+        observe_detection("bulk", text, entities)
+
+    results = []
+    for text in texts:
+        anonymized_text, entities, was_degraded, timed_out = by_text[text]
+        results.append({
+            "anonymized_text": anonymized_text,
+            "entities": [dict(e) for e in entities],
+            "degraded": was_degraded,
+            "regex_timeout": timed_out
+        })
+    return results
+
+def detect_pii_batch(texts, use_model=True, enabled_labels=None):
+    """
+    Bulk PII detection for offline jobs, without running the server:
+
+        from app import detect_pii_batch
+        results = detect_pii_batch(messages)
+
+    Loads the model on first use (blocking) and runs it on the calling thread.
+    """
+    run_model = None
+    if use_model and model_enabled(enabled_labels) and model_loader.wait():
+        run_model = run_pii_batch
+    return detect_batch(texts, run_model, enabled_labels)
+
+@app.post("/detect_pii/batch")
+async def detect_pii_batch_endpoint(request: BatchRequest):
+    """
+    PII detection for a list of texts, e.g. exported chat transcripts.
+    Returns one result per text, in order. Model batches go through the
+    shared inference pool, one at a time per request.
+    """
+    if len(request.texts) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} texts per batch")
+
+    loop = asyncio.get_running_loop()
+
+    def run_model(inputs):
+        return asyncio.run_coroutine_threadsafe(inference_pool.run(inputs), loop).result()
+
+    if not model_loader.ready:
+        model_loader.start()
+        logger.debug(f"⏳ Piiranha model {model_loader.state}, serving regex-only batch detection")
+        run_model = None
+
+    try:
+        results = await asyncio.to_thread(detect_batch, request.texts, run_model, request.enabled_labels)
+    except InferenceBusy:
+        raise HTTPException(status_code=429, detail="PII model is busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    log_sampled(f"📦 Batch detection: {len(results)} texts, {sum(r['degraded'] for r in results)} regex-only")
+    # Plain JSON types only, so skip FastAPI's per-field encoding of large bodies
+    return JSONResponse(content={"results": results})
+
+def anonymize_lines(lines, fmt="ndjson", mode="fake", field="text", include_entities=False, run_model=None):
+    """
+    Anonymize a batch of input lines (see streaming.parse_line), returning
+    one output line per input line. mode "fake" substitutes fake data like
+    /replace_with_fake; "placeholder" writes [ENTITY_GROUP] like /detect_pii.
+    """
+    parsed = [parse_line(line, fmt, field) for line in lines]
+    results = iter(detect_batch([text for _, text in parsed if text is not None], run_model))
+
+    output = []
+    for record, text in parsed:
+        if text is None:
+            output.append(render_line(record, fmt, field))
+            continue
+        result = next(results)
+        if mode == "fake":
+            anonymized_text, entities = replace_with_fake_data(result["entities"], text)
+        else:
+            anonymized_text, entities = result["anonymized_text"], result["entities"]
+        output.append(render_line(record, fmt, field, anonymized_text, entities if include_entities else None))
+    return output
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body reads the request while responding.
+    The stock class listens for disconnects on receive() in parallel, which
+    would consume the upload before the body iterator gets to it.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+@app.post("/anonymize/stream")
+async def anonymize_stream(request: Request, format: str = "ndjson", mode: str = "fake",
+                           field: str = "text", entities: bool = False):
+    """
+    Streamed anonymization of a chunked upload, one record per line: NDJSON
+    (the `field` of each object, or bare JSON strings) or plain text lines.
+    Output lines match input lines one to one and are sent as each batch of
+    records is done, so memory stays flat whatever the upload size.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    if mode not in ("fake", "placeholder"):
+        raise HTTPException(status_code=422, detail="mode must be fake or placeholder")
+
+    loop = asyncio.get_running_loop()
+
+    def run_model(inputs):
+        # A stream waits up to MODEL_TIMEOUT for a free pool slot rather
+        # than degrading as soon as interactive requests fill the pool
+        deadline = time.monotonic() + MODEL_TIMEOUT
+        while True:
+            try:
+                return asyncio.run_coroutine_threadsafe(inference_pool.run(inputs), loop).result()
+            except InferenceBusy:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    async def anonymize(batch):
+        try:
+            lines = await asyncio.to_thread(
+                anonymize_lines, batch, format, mode, field, entities,
+                run_model if model_loader.ready else None
+            )
+        except InferenceBusy:
+            # The response has started, so answer this batch regex-only
+            lines = await asyncio.to_thread(anonymize_lines, batch, format, mode, field, entities)
+        return "".join(lines)
+
+    async def generate():
+        model_loader.start()
+        splitter = LineSplitter(STREAM_MAX_LINE)
+        pending = []
+        async for chunk in request.stream():
+            pending.extend(splitter.feed(chunk))
+            while len(pending) >= BULK_BATCH_SIZE:
+                batch, pending = pending[:BULK_BATCH_SIZE], pending[BULK_BATCH_SIZE:]
+                yield await anonymize(batch)
+        pending.extend(splitter.close())
+        for i in range(0, len(pending), BULK_BATCH_SIZE):
+            yield await anonymize(pending[i:i + BULK_BATCH_SIZE])
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/plain; charset=utf-8"
+    return DuplexStreamingResponse(generate(), media_type=media_type)
+
+@app.get("/admin/cache", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    return dict(detection_cache.stats(), segments=segment_cache.stats())
+
+@app.delete("/admin/cache", dependencies=[Depends(require_admin)])
+async def purge_cache():
+    return {"purged": detection_cache.purge(), "purged_segments": segment_cache.purge()}
+
+@app.get("/admin/pseudonyms", dependencies=[Depends(require_admin)])
+async def pseudonym_stats():
+    return pseudonymizer.stats()
+
+@app.get("/admin/cascade", dependencies=[Depends(require_admin)])
+async def cascade_stats():
+    return cascade.stats()
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile(seconds: float = 10, interval_ms: float = 10, idle: bool = False):
+    """
+    Sample this worker's threads (the event loop with /detect_pii and regex
+    detection, the model threads with the forward pass) for seconds, and return
+    the stacks in collapsed format for flamegraph.pl or speedscope.
+    """
+    global profile_running
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if profile_running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    profile_running = True
+    try:
+        stacks = await asyncio.to_thread(profiling.sample, seconds, interval_ms / 1000, idle)
+    finally:
+        profile_running = False
+    logger.info(f"🔬 Profiled for {seconds:g} s: {sum(stacks.values())} samples")
+    return PlainTextResponse(profiling.collapsed(stacks))
+
+@app.on_event("startup")
+def start_model_loading():
+    if MODEL_LOAD == "background":
+        model_loader.start()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape target: request, stage, cache and queue metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving (possibly regex-only)"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the model is loaded, 503 while loading or after a failed load"""
+    status = model_loader.status()
+    if not model_loader.ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    inference_pool.shutdown()
+    pseudonymizer.close()
+
 @app.get("/")
 async def root():
-    return {"message": "DigitalTwin PII Detection API", "status": "active", "endpoints": ["/detect_pii", "/detect_pii_hybrid", "/replace_with_fake"]}
+    return {"message": "DigitalTwin PII Detection API", "status": "active", "endpoints": ["/detect_pii", "/detect_pii_hybrid", "/detect_pii/incremental", "/detect_pii/batch", "/replace_with_fake", "/anonymize/stream", "/ws/detect"]}
 
@@ -0,0 +1,581 @@
+"""
+Benchmarks for the detection pipeline, with machine-readable results.
+
+    python benchmark.py micro [--corpus FILE] [-n 1000] [--json]
+    python benchmark.py load [--url http://127.0.0.1:8000] [--requests 2000] [--concurrency 16] [--json]
+    python benchmark.py scaling [--sizes 4000,8000,16000,32000] [--max-growth 1.3] [--json]
+    python benchmark.py serialization [--sizes 1000,100000,1000000] [--json]
+    python benchmark.py cascade [--model] [--json]
+    python benchmark.py decoding [--sizes 10000,100000] [--json]
+
+micro times, in this process and without the model:
+- detect_basic_pii on each kind of text in the corpus (see workload.py)
+- each regex detector family on its own over the whole corpus, and the
+  gazetteer rules
+- merging, placeholder rewriting and replace_with_fake_data
+
+load sends /detect_pii (or --endpoint) requests from concurrent keep-alive
+connections and reports latency percentiles, throughput, status codes, the
+share of degraded answers and per-stage time from the server's /metrics.
+Without --url it starts a local uvicorn and stops it afterwards.
+
+scaling times the regex detector on each of workload.ADVERSARIAL_SHAPES at
+doubling sizes and fits the growth exponent k of time ~ size^k. The exit
+status is 1 when a shape grows faster than --max-growth (1 is linear).
+
+serialization encodes a /detect_pii response for corpus text cut to each
+size: the default JSON body (through FastAPI's encoder, as the endpoint
+does) against the compact body as JSON and as MessagePack, with and
+without the anonymized text. Rows report encoding time and body bytes.
+
+cascade runs the model cascade (see cascade.py) in each skipping mode on
+each kind of text after regex detection, and reports the decision time and
+the share of texts the model is skipped on. With --model it also runs the
+model on every text and reports the recall lost: the share of the model's
+entities that fall in skipped texts and overlap no regex entity.
+
+decoding loads the model, runs it once over corpus text cut to each size
+(in windows, as /detect_pii does) and then times only the post-processing
+of those outputs: the transformers pipeline's "simple" aggregation plus
+the conversion to the service format, against decoding.decode. Rows also
+count the windows where the two disagree.
+
+Both write JSON with --json or --output FILE. With --baseline FILE the run
+is compared to an earlier result, and the exit status is 1 when a latency
+or throughput figure regressed by more than --tolerance.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+
+import workload
+from compare_backends import MODEL_NAME, percentile
+
+# Result fields checked against a baseline, and which direction is worse
+LOWER_IS_BETTER = ("mean_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("requests_per_s",)
+
+_STAGE_SAMPLE = re.compile(r'^pii_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+def summarize(name, seconds, chars=0, **extra):
+    """Result row for a list of per-operation timings."""
+    total = sum(seconds)
+    row = {
+        "name": name,
+        "ops": len(seconds),
+        "mean_ms": total / len(seconds) * 1000,
+        "p50_ms": percentile(seconds, 0.5) * 1000,
+        "p95_ms": percentile(seconds, 0.95) * 1000,
+        "p99_ms": percentile(seconds, 0.99) * 1000,
+        "max_ms": max(seconds) * 1000,
+    }
+    if chars:
+        row["mb_per_s"] = chars / total / 1e6 if total else 0.0
+    row.update(extra)
+    return row
+
+
+def time_each(func, items, repeats):
+    """Per-item timings of func, keeping the fastest of repeats for each item."""
+    best = [float("inf")] * len(items)
+    for _ in range(repeats):
+        for i, item in enumerate(items):
+            started = time.perf_counter()
+            func(item)
+            best[i] = min(best[i], time.perf_counter() - started)
+    return best
+
+
+def run_micro(records, repeats):
+    # Imported here so `load` never pulls the app into the client process
+    import app
+    from prefilter import TextCensus
+    from regex_detector import DETECTOR_FAMILIES
+
+    texts = [text for _, text in records]
+    by_kind = defaultdict(list)
+    for kind, text in records:
+        by_kind[kind].append(text)
+
+    results = []
+    for kind in sorted(by_kind):
+        kind_texts = by_kind[kind]
+        timings = time_each(app.detect_basic_pii, kind_texts, repeats)
+        results.append(summarize(f"detect_basic_pii[{kind}]", timings, sum(map(len, kind_texts))))
+    timings = time_each(app.detect_basic_pii, texts, repeats)
+    results.append(summarize("detect_basic_pii[all]", timings, sum(map(len, texts))))
+
+    # Each family's patterns on their own, as re.finditer would run them
+    for entity_group, _, patterns, flags, _, _ in DETECTOR_FAMILIES:
+        compiled = [re.compile(p[0] if isinstance(p, tuple) else p, flags) for p in patterns]
+
+        def scan(text, compiled=compiled):
+            for regex in compiled:
+                for _ in regex.finditer(text):
+                    pass
+
+        timings = time_each(scan, texts, repeats)
+        results.append(summarize(f"family[{entity_group}]", timings, sum(map(len, texts)),
+                                 patterns=len(compiled)))
+
+    # Names and places matched against the gazetteer rather than by a family's patterns
+    detector = app.basic_pii_detector
+    timings = time_each(lambda text: detector._scan_gazetteer(text, [], TextCensus(text), None), texts, repeats)
+    results.append(summarize("gazetteer", timings, sum(map(len, texts)), entries=len(detector.gazetteer)))
+
+    detected = [(text, app.detect_basic_pii(text)[0]) for text in texts]
+    # Model-like entities for the merge: shifted copies of the regex ones
+    model_like = [
+        [dict(e, start=e["start"] + 1, end=e["end"] + 1, confidence=0.99) for e in entities]
+        for _, entities in detected
+    ]
+    pairs = list(zip(model_like, (entities for _, entities in detected)))
+    results.append(summarize("merge_entities", time_each(lambda p: app.merge_entities(*p), pairs, repeats)))
+    results.append(summarize("anonymize_with_placeholders",
+                             time_each(lambda d: app.anonymize_with_placeholders(*d), detected, repeats)))
+    results.append(summarize("replace_with_fake_data",
+                             time_each(lambda d: app.replace_with_fake_data(d[1], d[0]), detected, repeats),
+                             entities=sum(len(e) for _, e in detected)))
+    return results
+
+
+def growth_exponent(sizes, seconds):
+    """Least-squares slope of log(seconds) over log(size)."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(s, 1e-9)) for s in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 0.0
+
+
+def run_scaling(sizes, repeats, max_seconds=2.0):
+    from regex_detector import RegexPIIDetector
+
+    detector = RegexPIIDetector()
+    results = []
+    for shape, make in workload.ADVERSARIAL_SHAPES.items():
+        measured, seconds = [], []
+        for size in sizes:
+            text = make(size)
+            best = min(time_each(detector.detect, [text], repeats))
+            measured.append(len(text))
+            seconds.append(best)
+            # A runaway shape has already shown itself; don't wait for the next size
+            if best > max_seconds:
+                break
+        row = summarize(f"scaling[{shape}]", seconds[-1:], measured[-1])
+        row.update(sizes=measured, ms=[s * 1000 for s in seconds], stopped_early=len(seconds) < len(sizes),
+                   growth=growth_exponent(measured, seconds) if len(seconds) > 1 else None)
+        results.append(row)
+    return results
+
+
+def run_serialization(records, sizes, repeats):
+    import app
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from responses import MsgPackResponse, columnar, msgpack_available
+
+    corpus = "\n".join(text for _, text in records)
+    results = []
+    for size in sizes:
+        text = (corpus * (size // max(len(corpus), 1) + 1))[:size]
+        entities, _ = app.detect_basic_pii(text)
+        anonymized_text = app.anonymize_with_placeholders(text, entities)
+        flags = {"degraded": False, "regex_timeout": False}
+        full = dict(anonymized_text=anonymized_text, entities=entities, original_text=text, **flags)
+        compact = dict(entities=columnar(entities), **flags)
+        encodings = {
+            "default": lambda: JSONResponse(jsonable_encoder(full)).body,
+            "compact": lambda: JSONResponse(dict(compact)).body,
+            "compact+text": lambda: JSONResponse(dict(compact, anonymized_text=anonymized_text)).body,
+        }
+        if msgpack_available():
+            encodings["msgpack"] = lambda: MsgPackResponse(dict(compact)).body
+            encodings["msgpack+text"] = lambda: MsgPackResponse(
+                dict(compact, anonymized_text=anonymized_text)).body
+        for name, encode in encodings.items():
+            timings = time_each(lambda _: encode(), [None], repeats)
+            results.append(summarize(f"serialize[{name}@{size}]", timings, len(text),
+                                     bytes=len(encode()), entities=len(entities)))
+    return results
+
+
+def run_cascade(records, repeats, use_model=False):
+    import app
+    from cascade import Cascade
+
+    detected = [(kind, text, app.detect_basic_pii(text)[0]) for kind, text in records]
+    model_found = None
+    if use_model and app.model_loader.wait():
+        model_found, _ = app.model_pii_bulk([text for _, text, _ in detected], app.run_pii_batch)
+
+    by_kind = defaultdict(list)
+    for i, (kind, _, _) in enumerate(detected):
+        by_kind[kind].append(i)
+    by_kind["all"] = list(range(len(detected)))
+
+    results = []
+    for mode in ("covered", "clean"):
+        cascade = Cascade(mode, app.cascade.words)
+        for kind in sorted(by_kind):
+            items = [detected[i] for i in by_kind[kind]]
+            timings = time_each(lambda item: cascade.decide(item[1], item[2]), items, repeats)
+            skipped = [i for i in by_kind[kind] if cascade.decide(detected[i][1], detected[i][2]) is not None]
+            row = summarize(f"cascade[{mode}:{kind}]", timings, sum(len(text) for _, text, _ in items),
+                            skip_rate=len(skipped) / len(items))
+            if model_found is not None:
+                found = sum(len(model_found[i]) for i in by_kind[kind])
+                missed = sum(cascade.record_audit(model_found[i], detected[i][2]) for i in skipped)
+                row.update(model_entities=found, missed_entities=missed,
+                           recall_loss=missed / found if found else 0.0)
+            results.append(row)
+    return results
+
+
+def run_decoding(records, sizes, repeats):
+    import torch
+
+    from chunking import token_windows
+    from decoding import LabelScheme, decode
+    from model_backend import encode, load_backend
+
+    run_batch, tokenizer, config = load_backend(MODEL_NAME, "pipeline")
+    pipeline = run_batch.pipeline
+    scheme = LabelScheme(config.id2label)
+    max_tokens = tokenizer.model_max_length - tokenizer.num_special_tokens_to_add()
+
+    def aggregate(outputs):
+        return [{
+            "start": int(item["start"]),
+            "end": int(item["end"]),
+            "entity_group": str(item["entity_group"]).upper(),
+            "confidence": float(item["score"])
+        } for item in pipeline.postprocess(outputs, **pipeline._postprocess_params)]
+
+    corpus = "\n".join(text for _, text in records)
+    results = []
+    for size in sizes:
+        text = (corpus * (size // max(len(corpus), 1) + 1))[:size]
+        pieces = [text[start:end] for start, end in token_windows(text, tokenizer, max_tokens, 64)]
+        # Model outputs for both paths, computed once and outside the timings
+        window_outputs = [
+            [pipeline.forward(inputs) for inputs in pipeline.preprocess(piece, **pipeline._preprocess_params)]
+            for piece in pieces
+        ]
+        batches = []
+        for i in range(0, len(pieces), 8):
+            encoding, skip = encode(tokenizer, pieces[i:i + 8])
+            with torch.inference_mode():
+                logits = pipeline.model(input_ids=torch.from_numpy(encoding["input_ids"].astype("int64")),
+                                        attention_mask=torch.from_numpy(encoding["attention_mask"].astype("int64"))
+                                        ).logits.float().numpy()
+            batches.append((logits, encoding["offset_mapping"], skip))
+
+        expected = [aggregate(outputs) for outputs in window_outputs]
+        decoded = [entities for batch in batches for entities in decode(*batch, scheme)]
+        spans = [[[(e["start"], e["end"], e["entity_group"]) for e in found] for found in run]
+                 for run in (expected, decoded)]
+        mismatched = sum(a != b for a, b in zip(*spans))
+        extra = dict(windows=len(pieces), entities=sum(map(len, expected)))
+        timings = time_each(lambda _: [aggregate(outputs) for outputs in window_outputs], [None], repeats)
+        results.append(summarize(f"postprocess[pipeline@{size}]", timings, len(text), **extra))
+        timings = time_each(lambda _: [decode(*batch, scheme) for batch in batches], [None], repeats)
+        results.append(summarize(f"postprocess[decode@{size}]", timings, len(text), mismatched=mismatched, **extra))
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url, path, timeout=5):
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read().decode()
+    finally:
+        connection.close()
+
+
+def wait_for(url, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if get(url, path)[0] == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def stage_totals(url):
+    """{stage: (seconds, count)} from the server's /metrics, or {} if unavailable."""
+    try:
+        status, body = get(url, "/metrics")
+    except OSError:
+        return {}
+    if status != 200:
+        return {}
+    totals = defaultdict(lambda: [0.0, 0])
+    for kind, stage, value in _STAGE_SAMPLE.findall(body):
+        totals[stage][0 if kind == "sum" else 1] = float(value)
+    return dict(totals)
+
+
+def run_load(url, endpoint, texts, requests, concurrency, warmup):
+    parts = urllib.parse.urlsplit(url)
+    payloads = itertools.cycle([json.dumps({"text": text}).encode() for text in texts])
+    lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    degraded = 0
+    errors = Counter()
+
+    def worker(count, record):
+        nonlocal degraded
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        for _ in range(count):
+            with lock:
+                body = next(payloads)
+            started = time.perf_counter()
+            try:
+                connection.request("POST", endpoint, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+                if record:
+                    with lock:
+                        errors[type(e).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if record:
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status] += 1
+                    if response.status == 200 and json.loads(data).get("degraded"):
+                        degraded += 1
+        connection.close()
+
+    def run(total, record):
+        shares = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+        threads = [threading.Thread(target=worker, args=(share, record)) for share in shares if share]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    run(warmup, False)
+    stages_before = stage_totals(url)
+    elapsed = run(requests, True)
+    stages_after = stage_totals(url)
+
+    if not latencies:
+        raise SystemExit(f"No successful requests to {url}{endpoint}: {dict(errors)}")
+    row = summarize(endpoint, latencies, requests_per_s=len(latencies) / elapsed,
+                    concurrency=concurrency, statuses={str(k): v for k, v in sorted(statuses.items())},
+                    errors=dict(errors), degraded_share=degraded / len(latencies))
+    stages = {}
+    for stage, (seconds, count) in stages_after.items():
+        before_seconds, before_count = stages_before.get(stage, (0.0, 0))
+        if count > before_count:
+            stages[stage] = {"count": int(count - before_count),
+                             "mean_ms": (seconds - before_seconds) / (count - before_count) * 1000}
+    if stages:
+        row["stages"] = stages
+    return [row]
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against baseline results, as printable lines."""
+    previous = {row["name"]: row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        before = previous.get(row["name"])
+        if before is None:
+            continue
+        for field in LOWER_IS_BETTER:
+            if field in row and before.get(field) and row[field] > before[field] * (1 + tolerance):
+                regressions.append(f"{row['name']}: {field} {before[field]:.3f} -> {row[field]:.3f}")
+        for field in HIGHER_IS_BETTER:
+            if field in row and before.get(field) and row[field] < before[field] * (1 - tolerance):
+                regressions.append(f"{row['name']}: {field} {before[field]:.1f} -> {row[field]:.1f}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'benchmark':<34} {'ops':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'extra':>12}")
+    for row in results:
+        if row.get("growth") is not None:
+            extra = f"n^{row['growth']:.2f}"
+        elif "requests_per_s" in row:
+            extra = f"{row['requests_per_s']:.1f} req/s"
+        elif "skip_rate" in row:
+            extra = f"{row['skip_rate']:.1%} skip"
+        elif "bytes" in row:
+            extra = f"{row['bytes'] / 1000:.1f} KB"
+        elif "mb_per_s" in row:
+            extra = f"{row['mb_per_s']:.2f} MB/s"
+        else:
+            extra = ""
+        print(f"{row['name']:<34} {row['ops']:>6} {row['mean_ms']:>9.3f} {row['p50_ms']:>8.3f} "
+              f"{row['p95_ms']:>8.3f} {row['p99_ms']:>8.3f} {extra:>12}")
+        for stage, figures in sorted(row.get("stages", {}).items()):
+            print(f"  stage {stage:<26} {figures['count']:>6} {figures['mean_ms']:>9.3f}")
+        if row.get("statuses"):
+            print(f"  statuses {row['statuses']}, errors {row['errors']}, degraded {row['degraded_share']:.1%}")
+        if "mismatched" in row:
+            print(f"  {row['mismatched']} of {row['windows']} windows differ from the pipeline, "
+                  f"{row['entities']} entities")
+        if row.get("recall_loss") is not None:
+            print(f"  recall loss {row['recall_loss']:.2%} ({row['missed_entities']} of {row['model_entities']} "
+                  "model entities)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suite", choices=("micro", "load", "scaling", "serialization", "cascade", "decoding"))
+    parser.add_argument("--corpus", help="NDJSON from workload.py, or one text per line")
+    parser.add_argument("-n", type=int, default=1000, help="generated corpus size without --corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", help="comma-separated workload kinds for the generated corpus")
+    parser.add_argument("--repeats", type=int, default=3, help="micro, scaling, serialization, cascade, decoding: runs per text, fastest kept")
+    parser.add_argument("--url", help="load: server to test; default starts a local uvicorn")
+    parser.add_argument("--endpoint", default="/detect_pii")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--regex-only", action="store_true",
+                        help="load: don't wait for the local server's model (answers are degraded)")
+    parser.add_argument("--sizes", help="scaling, serialization, decoding: comma-separated text sizes "
+                        "(default 4000,8000,16000,32000; 1000,100000,1000000; 10000,100000)")
+    parser.add_argument("--model", action="store_true",
+                        help="cascade: load the model and report the recall lost on skipped texts")
+    parser.add_argument("--max-growth", type=float, default=1.3, help="scaling: highest allowed growth exponent")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    if args.corpus:
+        records = workload.load(args.corpus)
+    else:
+        kinds = [k.strip() for k in args.kinds.split(",")] if args.kinds else None
+        records = list(workload.generate(args.n, args.seed, kinds))
+
+    config = {"records": len(records), "corpus": args.corpus or f"workload seed={args.seed} n={args.n}"}
+    if args.suite == "micro":
+        import logging
+        logging.basicConfig(level=logging.WARNING)
+        config["repeats"] = args.repeats
+        results = run_micro(records, args.repeats)
+    elif args.suite == "scaling":
+        sizes = [int(size) for size in (args.sizes or "4000,8000,16000,32000").split(",")]
+        config = {"sizes": sizes, "repeats": args.repeats, "max_growth": args.max_growth}
+        results = run_scaling(sizes, args.repeats)
+    elif args.suite == "serialization":
+        import logging
+        logging.basicConfig(level=logging.WARNING)
+        sizes = [int(size) for size in (args.sizes or "1000,100000,1000000").split(",")]
+        config.update(sizes=sizes, repeats=args.repeats)
+        results = run_serialization(records, sizes, args.repeats)
+    elif args.suite == "cascade":
+        import logging
+        logging.basicConfig(level=logging.WARNING)
+        config.update(repeats=args.repeats, model=args.model)
+        results = run_cascade(records, args.repeats, args.model)
+    elif args.suite == "decoding":
+        import logging
+        logging.basicConfig(level=logging.WARNING)
+        sizes = [int(size) for size in (args.sizes or "10000,100000").split(",")]
+        config.update(sizes=sizes, repeats=args.repeats)
+        results = run_decoding(records, sizes, args.repeats)
+    else:
+        server = None
+        url = args.url
+        if url is None:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+                 "--log-level", "warning"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=dict(os.environ, PII_LOG_SAMPLE_RATE="0"),
+            )
+        try:
+            if not wait_for(url, "/healthz", 120):
+                raise SystemExit(f"{url} did not come up")
+            if server is not None and not args.regex_only and not wait_for(url, "/readyz", 600):
+                raise SystemExit(f"{url} did not load the model")
+            config.update(url=url if server is None else "local", requests=args.requests,
+                          concurrency=args.concurrency)
+            results = run_load(url, args.endpoint, [text for _, text in records],
+                               args.requests, args.concurrency, args.warmup)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    report = {
+        "suite": args.suite,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(results)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+    if args.suite == "scaling":
+        superlinear = [row for row in results if row["stopped_early"]
+                       or row["growth"] is not None and row["growth"] > args.max_growth]
+        for row in superlinear:
+            if row["stopped_early"]:
+                print(f"SUPERLINEAR {row['name']}: {row['ms'][-1]:.0f} ms at {row['sizes'][-1]} characters",
+                      file=sys.stderr)
+            else:
+                print(f"SUPERLINEAR {row['name']}: time ~ size^{row['growth']:.2f}", file=sys.stderr)
+        if superlinear:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
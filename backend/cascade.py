@@ -0,0 +1,139 @@
+"""Cheap per-text decision whether the Piiranha model needs to run at all."""
+import re
+import threading
+from bisect import bisect_right
+
+from gazetteer import WORD
+
+MODES = ("covered", "clean", "off")
+
+# Places in a text where the model may find PII: a digit, "@", a word
+# capitalised inside a sentence, a non-ASCII letter. The pronoun "I" and its
+# contractions don't count.
+_SIGNALS = re.compile(
+    r"\d|@"
+    r"|(?<=[^\s.!?])\s+[\"'(]?(?!I(?:'[a-z]+)?\b)[A-Z]"
+    r"|[^\W\d_a-zA-Z]"
+)
+_FIRST_WORD = re.compile(r"\s*[\"'(]?([A-Z]\w*)")
+
+# Words a message commonly starts with; any other capitalised first word
+# (a name: "Sarah said ok") is a signal
+COMMON_FIRST_WORDS = frozenset("""
+    a about actually after again ah alright also am an and any anyone anything are aren as at
+    awesome be because been before best btw but by can cannot cheers could couldn dear did didn
+    do does doesn don done for from good got great had has hasn have haven he hello her here hey
+    hi his how i if in is isn it its just kindly let like lol maybe me morning my nah need never
+    nice no nope not noted now of off oh ok okay on once one or our perfect please pls really
+    regards right see she should so sorry sounds still sure thank thanks that the their them
+    then there these they this those though thx to today tomorrow tonight too understood until
+    up us was wasn we well were weren what when where which while who why will with won would
+    wouldn yeah yes yesterday yet you your yup
+""".split())
+
+
+class Cascade:
+    """Decides, after regex detection, whether a text still needs the model.
+
+    ``mode`` "covered" skips the model when every signal in the text (see
+    _SIGNALS, plus a capitalised first word that is not a common one and any
+    of ``words``, e.g. gazetteer names) lies inside a regex entity; "clean"
+    only when the text has no signal at all; "off" never.
+
+    Counts decisions and, for audited skipped texts, what the model would
+    have found; ``stats()`` derives the skip rate and recall loss from them.
+    """
+
+    def __init__(self, mode="covered", words=frozenset()):
+        if mode not in MODES:
+            raise ValueError(f"cascade mode must be one of {', '.join(MODES)}")
+        self.mode = mode
+        self.words = words
+        self._lock = threading.Lock()
+        self.decisions = {"model": 0, "clean": 0, "covered": 0}
+        # Entities the model found in texts it ran on
+        self.model_entities = 0
+        # Skipped texts the model was run on anyway, and its entities there
+        # that a regex entity covered or that were missed
+        self.audited = 0
+        self.audit_covered = 0
+        self.audit_missed = 0
+
+    def signals(self, text):
+        """Offsets of the signals in text, lazily and in no particular order."""
+        first = _FIRST_WORD.match(text)
+        if first is not None and first.group(1).lower() not in COMMON_FIRST_WORDS:
+            yield first.start(1)
+        for match in _SIGNALS.finditer(text):
+            yield match.end() - 1
+        if self.words:
+            lowered = text.lower()
+            if len(lowered) == len(text) and not self.words.isdisjoint(WORD.findall(lowered)):
+                for match in WORD.finditer(lowered):
+                    if match.group() in self.words:
+                        yield match.start()
+
+    def decide(self, text, regex_entities, complete=True):
+        """
+        None when the model should run, else why it can be skipped ("clean"
+        or "covered"). complete is False when regex detection stopped early,
+        so its entities cannot vouch for the rest of the text.
+        """
+        reason = None
+        if self.mode != "off" and complete:
+            signals = self.signals(text)
+            if self.mode == "clean":
+                reason = None if any(True for _ in signals) else "clean"
+            else:
+                starts = [entity["start"] for entity in regex_entities]
+                uncovered = False
+                seen = False
+                for offset in signals:
+                    seen = True
+                    i = bisect_right(starts, offset) - 1
+                    if i < 0 or offset >= regex_entities[i]["end"]:
+                        uncovered = True
+                        break
+                if not uncovered:
+                    reason = "covered" if seen else "clean"
+        with self._lock:
+            self.decisions[reason or "model"] += 1
+        return reason
+
+    def record_model(self, entities):
+        """Count entities the model found in a text it ran on."""
+        with self._lock:
+            self.model_entities += len(entities)
+
+    def record_audit(self, model_entities, regex_entities):
+        """Count the model's entities in a skipped text, covered by regex or missed."""
+        missed = sum(1 for entity in model_entities
+                     if not any(r["start"] < entity["end"] and entity["start"] < r["end"] for r in regex_entities))
+        with self._lock:
+            self.audited += 1
+            self.audit_missed += missed
+            self.audit_covered += len(model_entities) - missed
+        return missed
+
+    def stats(self):
+        with self._lock:
+            decisions = dict(self.decisions)
+            skipped = decisions["clean"] + decisions["covered"]
+            total = skipped + decisions["model"]
+            recall_loss = None
+            if self.audited:
+                # Model entities in all skipped texts, extrapolated from the audited ones
+                scale = skipped / self.audited
+                missed = self.audit_missed * scale
+                found = self.model_entities + (self.audit_missed + self.audit_covered) * scale
+                recall_loss = missed / found if found else 0.0
+            return {
+                "mode": self.mode,
+                "decisions": decisions,
+                "skip_rate": skipped / total if total else 0.0,
+                "audited": self.audited,
+                "audit_entities_covered": self.audit_covered,
+                "audit_entities_missed": self.audit_missed,
+                "recall_loss": recall_loss,
+            }
+
@@ -0,0 +1,77 @@
+"""Sliding-window inference helpers for texts longer than the model input."""
+
+
+def token_windows(text, tokenizer, max_tokens=510, overlap=64):
+    """
+    Character ranges covering text in windows of at most max_tokens tokens,
+    consecutive windows sharing about overlap tokens. Windows start and end
+    on word boundaries where possible, so re-tokenizing a window slice gives
+    the same word pieces as in the full text. A text that fits in one window
+    yields [(0, len(text))].
+    """
+    encoding = tokenizer(
+        text,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False
+    )
+    offsets = encoding["offset_mapping"]
+    count = len(offsets)
+    if count <= max_tokens:
+        return [(0, len(text))]
+
+    def word_start(i):
+        return i == 0 or offsets[i][0] > offsets[i - 1][1]
+
+    step = max(1, max_tokens - overlap)
+    windows = []
+    first = 0
+    while True:
+        last = min(first + max_tokens, count) - 1
+        # Shrink to a word end, unless the word alone fills the window
+        while last < count - 1 and last > first + step // 2 and not word_start(last + 1):
+            last -= 1
+        windows.append((offsets[first][0], offsets[last][1]))
+        if last == count - 1:
+            return windows
+
+        next_first = max(first + 1, last + 1 - overlap)
+        candidate = next_first
+        while candidate > first + 1 and not word_start(candidate):
+            candidate -= 1
+        first = candidate if word_start(candidate) else next_first
+
+
+def merge_window_entities(windows, window_entities):
+    """
+    Combine entities detected per window (offsets relative to the window)
+    into one list with text offsets. Where two windows overlap, each owns the
+    half nearer to itself, and an entity is kept by the window owning its
+    midpoint. Entities still overlapping after that keep the higher
+    confidence one.
+    """
+    # Ownership boundaries between consecutive windows, doubled to stay integral
+    bounds = [windows[i][1] + windows[i + 1][0] for i in range(len(windows) - 1)]
+    candidates = []
+    for i, ((window_start, _), entities) in enumerate(zip(windows, window_entities)):
+        low = bounds[i - 1] if i > 0 else None
+        high = bounds[i] if i < len(bounds) else None
+        for entity in entities:
+            start = entity["start"] + window_start
+            end = entity["end"] + window_start
+            middle = start + end
+            if (low is not None and middle < low) or (high is not None and middle >= high):
+                continue
+            candidates.append(dict(entity, start=start, end=end))
+
+    candidates.sort(key=lambda x: x["start"])
+    merged = []
+    for entity in candidates:
+        if merged and entity["start"] < merged[-1]["end"]:
+            if entity["confidence"] > merged[-1]["confidence"]:
+                merged[-1] = entity
+            continue
+        merged.append(entity)
+    return merged
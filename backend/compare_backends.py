@@ -0,0 +1,168 @@
+"""
+Compare Piiranha inference backends against the fp32 transformers pipeline.
+
+    python compare_backends.py [--backends torch,int8,onnx,onnx-int8,pipeline] [--corpus FILE] [--json]
+
+Each backend is loaded in its own subprocess so resident memory is measured
+in isolation. Reported per backend:
+- span/label precision, recall and F1 against the pipeline backend
+- the largest score difference on matching entities
+- per-text latency (p50/p95) unbatched and in batches of 8
+- load time, and RSS after loading and after the runs
+
+The corpus is one text per line; without --corpus a built-in sample is used.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from model_backend import BACKENDS, load_backend
+
+MODEL_NAME = "iiiorg/piiranha-v1-detect-personal-information"
+
+SAMPLE_CORPUS = [
+    "Hi, my name is Tan Wei Ming and my NRIC is S1234567A.",
+    "Please call me at +65 9123 4567 or email weiming.tan@example.com.",
+    "My credit card number is 4111 1111 1111 1111, expiry 08/27.",
+    "I live at Blk 123 Ang Mo Kio Avenue 3, #05-67, Singapore 560123.",
+    "Sarah Lim was born on 14 March 1990 and works at DBS.",
+    "Username: jtan88, password: Hunter2!secure",
+    "Send the invoice to Mr. Rajesh Kumar, 10 Anson Road, Singapore 079903.",
+    "Her passport number is E1234567 and her driving licence is S7654321B.",
+    "Account 123-456789-001 at OCBC should receive the transfer by Friday.",
+    "Nothing sensitive here, just a note about tomorrow's meeting agenda.",
+    "Dear John, thanks for the update. Regards, Nurul Aisyah binte Ahmad",
+    "Contact Li Na on 6123 4567 (office) or li.na@company.com.sg after 5pm.",
+]
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux)."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_backend(backend, texts, repeats):
+    """Load one backend and time it; runs inside the child process."""
+    started = time.perf_counter()
+    run_batch, _, _ = load_backend(MODEL_NAME, backend)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_mb()
+
+    run_batch(texts[:1])  # warm-up
+    single = []
+    for _ in range(repeats):
+        for text in texts:
+            started = time.perf_counter()
+            run_batch([text])
+            single.append(time.perf_counter() - started)
+
+    batched = []
+    for _ in range(repeats):
+        for i in range(0, len(texts), 8):
+            group = texts[i:i + 8]
+            started = time.perf_counter()
+            run_batch(group)
+            batched.append((time.perf_counter() - started) / len(group))
+
+    entities = []
+    for i in range(0, len(texts), 8):
+        for result in run_batch(texts[i:i + 8]):
+            entities.append([
+                [e["start"], e["end"], e["entity_group"], e["confidence"]]
+                for e in result
+            ])
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_loaded_mb": rss_loaded,
+        "rss_after_mb": rss_mb(),
+        "single_p50_ms": percentile(single, 0.5) * 1000,
+        "single_p95_ms": percentile(single, 0.95) * 1000,
+        "batched_p50_ms": percentile(batched, 0.5) * 1000,
+        "batched_p95_ms": percentile(batched, 0.95) * 1000,
+        "entities": entities,
+    }
+
+
+def parity(reference, candidate):
+    """Precision/recall/F1 of candidate entities against reference, plus max score diff."""
+    matched = expected = found = 0
+    score_diff = 0.0
+    for ref_entities, cand_entities in zip(reference, candidate):
+        ref = {(s, e, label): score for s, e, label, score in ref_entities}
+        cand = {(s, e, label): score for s, e, label, score in cand_entities}
+        expected += len(ref)
+        found += len(cand)
+        for key in ref.keys() & cand.keys():
+            matched += 1
+            score_diff = max(score_diff, abs(ref[key] - cand[key]))
+    precision = matched / found if found else 1.0
+    recall = matched / expected if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1, "max_score_diff": score_diff}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--corpus", help="file with one text per line")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            texts = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        texts = SAMPLE_CORPUS
+
+    if args.child:
+        json.dump(run_backend(args.child, texts, args.repeats), sys.stdout)
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "pipeline" not in backends:
+        backends.insert(0, "pipeline")
+    results = []
+    for backend in backends:
+        command = [sys.executable, os.path.abspath(__file__), "--child", backend, "--repeats", str(args.repeats)]
+        if args.corpus:
+            command += ["--corpus", args.corpus]
+        child = subprocess.run(command, capture_output=True, text=True)
+        if child.returncode != 0:
+            print(f"{backend}: failed\n{child.stderr[-2000:]}", file=sys.stderr)
+            continue
+        results.append(json.loads(child.stdout))
+
+    reference = next(r for r in results if r["backend"] == "pipeline")["entities"]
+    for result in results:
+        result.update(parity(reference, result.pop("entities")))
+
+    if args.json:
+        json.dump({"texts": len(texts), "results": results}, sys.stdout, indent=2)
+        print()
+        return
+
+    print(f"{len(texts)} texts, {args.repeats} repeats")
+    print(f"{'backend':<10} {'F1':>6} {'score Δ':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'batch8 ms':>10} {'load s':>7} {'RSS MB':>7}")
+    for r in results:
+        print(f"{r['backend']:<10} {r['f1']:>6.3f} {r['max_score_diff']:>8.4f} {r['single_p50_ms']:>8.1f} "
+              f"{r['single_p95_ms']:>8.1f} {r['batched_p50_ms']:>10.2f} {r['load_seconds']:>7.1f} "
+              f"{r['rss_after_mb']:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
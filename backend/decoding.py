@@ -0,0 +1,71 @@
+"""Token-classification logits to entity spans, with array operations only."""
+import numpy as np
+
+
+class LabelScheme:
+    """Per-label lookup arrays derived from a model's ``id2label``.
+
+    ``tags[label]`` numbers the label's tag ("B-EMAIL" and "I-EMAIL" share
+    one, "O" has its own), ``begins[label]`` is set for "B-" labels, and
+    ``names[tag]`` is the uppercased entity group.
+    """
+
+    def __init__(self, id2label):
+        names = []
+        tags = []
+        begins = []
+        for i in range(len(id2label)):
+            label = id2label[i]
+            prefix, _, rest = label.partition("-")
+            tag = rest if prefix in ("B", "I") and rest else label
+            if tag.upper() not in names:
+                names.append(tag.upper())
+            tags.append(names.index(tag.upper()))
+            begins.append(prefix == "B" and bool(rest))
+        self.names = names
+        self.tags = np.array(tags, dtype=np.intp)
+        self.begins = np.array(begins, dtype=bool)
+        self.outside = names.index("O") if "O" in names else -1
+
+
+def decode(logits, offsets, skip, scheme):
+    """
+    Entities per row of a batch, in the service format (start, end,
+    entity_group, confidence), grouped like the transformers pipeline with
+    aggregation_strategy="simple": consecutive tokens with the same tag
+    form one entity unless a token is tagged "B-", "O" groups are dropped,
+    and the confidence is the mean of the tokens' top softmax scores.
+
+    logits is (rows, tokens, labels), offsets (rows, tokens, 2) character
+    offsets and skip (rows, tokens) true for special and padding tokens.
+    The whole batch is decoded at once; Python only builds the result dicts.
+    """
+    entities = [[] for _ in range(logits.shape[0])]
+    row, col = np.nonzero(~skip)
+    if not len(row):
+        return entities
+
+    logits = logits[row, col]
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    scores = shifted / shifted.sum(axis=-1, keepdims=True)
+    labels = scores.argmax(axis=-1)
+    best = scores[np.arange(len(labels)), labels]
+    tags = scheme.tags[labels]
+
+    # A group starts at each row's first token, a tag change or a "B-" token
+    starts = np.ones(len(labels), dtype=bool)
+    starts[1:] = (row[1:] != row[:-1]) | (tags[1:] != tags[:-1]) | scheme.begins[labels[1:]]
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:], len(labels)) - 1
+    mean = np.add.reduceat(best, first) / (last - first + 1).astype(best.dtype)
+
+    keep = tags[first] != scheme.outside
+    first, last, mean = first[keep], last[keep], mean[keep]
+    begin = offsets[row[first], col[first], 0]
+    end = offsets[row[last], col[last], 1]
+
+    names = scheme.names
+    for r, start, stop, tag, confidence in zip(row[first].tolist(), begin.tolist(), end.tolist(),
+                                               tags[first].tolist(), mean.tolist()):
+        entities[r].append({"start": start, "end": stop, "entity_group": names[tag], "confidence": confidence})
+    return entities
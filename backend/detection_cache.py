@@ -0,0 +1,121 @@
+"""In-memory cache of detection results keyed by a digest of the input."""
+import hashlib
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class DetectionCache:
+    """Byte-capped LRU cache with a TTL for per-text detection results.
+
+    Keys are keyed BLAKE2 digests of ``(kind, text, labels, version)``, using
+    a secret generated per process, so the cache never holds the text itself
+    and digests cannot be matched against guessed inputs. Values are entity
+    lists; they are copied on the way in and out because callers annotate
+    entities in place. Nothing is ever written to disk.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=300.0, version=""):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = version
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._secret = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def key(self, kind, text, labels=None):
+        digest = hashlib.blake2b(key=self._secret, digest_size=16)
+        label_part = "" if labels is None else ",".join(sorted(labels))
+        for part in (kind, label_part, self.version):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    @staticmethod
+    def _entry_size(key, entities):
+        size = sys.getsizeof(key) + sys.getsizeof(entities)
+        for entity in entities:
+            size += sys.getsizeof(entity) + sum(sys.getsizeof(v) for v in entity.values())
+        return size
+
+    def get(self, kind, text, labels=None):
+        """Return a copy of the cached entities, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = self.key(kind, text, labels)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(entity) for entity in entry[2]]
+
+    def put(self, kind, text, entities, labels=None):
+        if not self.enabled:
+            return
+        key = self.key(kind, text, labels)
+        value = [dict(entity) for entity in entities]
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # Drop stale entries at the cold end instead of waiting for a lookup
+            while self._entries:
+                oldest = next(iter(self._entries))
+                if self._entries[oldest][0] > now:
+                    break
+                self._remove(oldest)
+                self.expirations += 1
+            self._entries[key] = (now + self.ttl, size, value)
+            self.size += size
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+    def purge(self):
+        """Drop every entry; returns how many were removed."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self.size = 0
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,130 @@
+"""Word lists (surnames, given names, streets, estates) matched token by token."""
+import functools
+import os
+import re
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer")
+
+# One file per category, <category>.txt in the data directory
+CATEGORIES = ("surnames", "given_names", "streets", "estates")
+
+# Words are maximal \w runs, the units \b delimits in the regex patterns
+WORD = re.compile(r'\w+')
+# What may separate the words of a multi-word entry in text: whitespace,
+# or punctuation inside a name ("St. Andrew's Road", "Bukit Batok-West")
+_GAP = re.compile(r"\s+|\s*[.'’-]\s*")
+
+# Each prefix maps to one int: bit i set when the prefix is itself an
+# entry of category i, bit i + _REACH set when any entry of category i
+# starts with it
+_REACH = 16
+
+
+def normalize(entry):
+    """Lookup key of an entry or text phrase: its words, case-folded, space-joined."""
+    return " ".join(WORD.findall(entry.casefold()))
+
+
+class Gazetteer:
+    """Entries of every category in one prefix-keyed dict.
+
+    Every word prefix of every entry is a key ("ang", "ang mo", "ang mo
+    kio"), so a phrase is matched by extending the key one text word at a
+    time and stops at the first prefix that is not in the dict. Lookups
+    cost the same at fifty entries or fifty thousand, and nothing is
+    compiled from the lists.
+    """
+
+    def __init__(self, entries):
+        """entries maps a category to an iterable of entry strings."""
+        self._prefixes = {}
+        self._sets = {}
+        self.max_words = 0
+        self.sizes = {}
+        for category, phrases in entries.items():
+            bit = self.mask(category)
+            keys = {normalize(phrase) for phrase in phrases} - {""}
+            self.sizes[category] = len(keys)
+            for key in keys:
+                words = key.split(" ")
+                self.max_words = max(self.max_words, len(words))
+                for n in range(1, len(words) + 1):
+                    prefix = " ".join(words[:n])
+                    flags = self._prefixes.get(prefix, 0) | bit << _REACH
+                    if n == len(words):
+                        flags |= bit
+                    self._prefixes[prefix] = flags
+
+    @classmethod
+    def from_directory(cls, directory=DATA_DIR):
+        """Load <category>.txt files: one entry per line, "#" starts a comment."""
+        entries = {}
+        for category in CATEGORIES:
+            path = os.path.join(directory, f"{category}.txt")
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                entries[category] = [line.split("#", 1)[0].strip() for line in f]
+        return cls(entries)
+
+    @staticmethod
+    def mask(*categories):
+        """Bit mask selecting categories, for the lookups below."""
+        mask = 0
+        for category in categories:
+            mask |= 1 << CATEGORIES.index(category)
+        return mask
+
+    def starts(self, word, mask):
+        """Whether an entry of mask's categories starts with word (case-folded)."""
+        return bool(self._prefixes.get(word, 0) >> _REACH & mask)
+
+    def words(self, mask):
+        """Single-word entries of mask's categories, as a set for membership tests."""
+        return self._set(mask)
+
+    def first_words(self, mask):
+        """First words of the entries of mask's categories."""
+        return self._set(mask << _REACH)
+
+    def _set(self, bits):
+        found = self._sets.get(bits)
+        if found is None:
+            found = self._sets[bits] = frozenset(
+                key for key, flags in self._prefixes.items() if flags & bits and " " not in key
+            )
+        return found
+
+    def ends(self, text, pos, mask):
+        """
+        End offsets, in increasing order, of the entries of mask's
+        categories whose words start at text[pos] (a word start). Reads at
+        most as many words as the longest entry has.
+        """
+        key = None
+        found = []
+        get = self._prefixes.get
+        for _ in range(self.max_words):
+            word = WORD.match(text, pos)
+            if word is None:
+                break
+            key = word.group().casefold() if key is None else key + " " + word.group().casefold()
+            flags = get(key, 0)
+            if flags & mask:
+                found.append(word.end())
+            if not flags >> _REACH & mask:
+                break
+            gap = _GAP.match(text, word.end())
+            if gap is None:
+                break
+            pos = gap.end()
+        return found
+
+    def __len__(self):
+        return sum(self.sizes.values())
+
+
+@functools.lru_cache(maxsize=None)
+def load(directory=DATA_DIR):
+    """Gazetteer of directory, read once per process and shared."""
+    return Gazetteer.from_directory(directory)
@@ -0,0 +1,170 @@
+"""Session state and window arithmetic for incremental re-detection."""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# A sentence ends at terminal punctuation followed by whitespace, or a newline.
+# A bare "." (emails, decimals, "P.O.") is not a break.
+_SENTENCE_BREAK = re.compile(r'[.!?]\s+|\n')
+_WHITESPACE = re.compile(r'\s')
+
+
+class EditError(ValueError):
+    """Raised when an edit does not fit the session text."""
+
+
+def apply_edit(text, offset, delete, insert):
+    if offset < 0 or delete < 0 or offset + delete > len(text):
+        raise EditError(f"edit at {offset} deleting {delete} does not fit text of length {len(text)}")
+    return text[:offset] + insert + text[offset + delete:]
+
+
+def edit_window(text, start, end, max_radius=256):
+    """
+    Expand [start, end) to the enclosing sentence boundaries. A sentence
+    longer than max_radius on either side is cut at whitespace instead, so
+    the window stays proportional to the edit on unpunctuated text.
+    """
+    lower = max(0, start - max_radius)
+    window_start = None
+    for match in _SENTENCE_BREAK.finditer(text, lower, start):
+        window_start = match.end()
+    if window_start is None:
+        window_start = 0
+        if lower > 0:
+            space = _WHITESPACE.search(text, lower, start)
+            window_start = space.end() if space else lower
+
+    upper = min(len(text), end + max_radius)
+    match = _SENTENCE_BREAK.search(text, end, upper)
+    if match is not None:
+        window_end = match.end()
+    elif upper < len(text):
+        window_end = upper
+        for space in _WHITESPACE.finditer(text, end, upper):
+            window_end = space.start()
+    else:
+        window_end = len(text)
+    return window_start, max(window_end, end)
+
+
+def context_slice(text, start, end, padding=64):
+    """Widen [start, end) by padding characters, snapped outward to whitespace."""
+    slice_start = max(0, start - padding)
+    if slice_start > 0:
+        space = _WHITESPACE.search(text, slice_start, start)
+        slice_start = space.end() if space else slice_start
+    slice_end = min(len(text), end + padding)
+    if slice_end < len(text):
+        for space in _WHITESPACE.finditer(text, end, slice_end):
+            slice_end = space.start()
+    return slice_start, max(slice_end, end)
+
+
+def shift_entities(entities, offset, delete, delta):
+    """
+    Move entities of the pre-edit text to post-edit offsets. Entities
+    overlapping the deleted range are dropped; they are re-detected.
+    """
+    shifted = []
+    for entity in entities:
+        if entity["end"] <= offset:
+            shifted.append(dict(entity))
+        elif entity["start"] >= offset + delete:
+            moved = dict(entity)
+            moved["start"] += delta
+            moved["end"] += delta
+            shifted.append(moved)
+    return shifted
+
+
+def cover_edit(span, offset, delete, insert):
+    """
+    Smallest range of the post-edit text covering the inserted text and span,
+    a range of the pre-edit text (or None). Tracks the text touched by edits
+    that have not been re-detected yet.
+    """
+    end = offset + len(insert)
+    if span is None:
+        return offset, end
+    start, stop = span
+    delta = len(insert) - delete
+    if start > offset:
+        start = start + delta if start >= offset + delete else offset
+    if stop > offset:
+        stop = stop + delta if stop >= offset + delete else end
+    return min(start, offset), max(stop, end)
+
+
+def splice_entities(kept, window, fresh):
+    """
+    Replace entities inside window with freshly detected ones. fresh entities
+    only count when they reach into the window; kept entities that collide
+    with them are dropped.
+    """
+    window_start, window_end = window
+    fresh = [e for e in fresh if e["end"] > window_start and e["start"] < window_end]
+    result = list(fresh)
+    for entity in kept:
+        if window_start < entity["end"] and entity["start"] < window_end:
+            continue
+        if any(entity["start"] < e["end"] and e["start"] < entity["end"] for e in fresh):
+            continue
+        result.append(entity)
+    result.sort(key=lambda x: x["start"])
+    return result
+
+
+class DetectionSession:
+    """Text of one live input box and the entities last detected in it."""
+
+    def __init__(self, text, regex_entities, model_entities, model_stale=False, enabled_labels=None):
+        self.text = text
+        self.enabled_labels = enabled_labels
+        self.regex_entities = regex_entities
+        self.model_entities = model_entities
+        # Model entities are incomplete (the model was unavailable), so the
+        # next edit re-runs the model over the whole text
+        self.model_stale = model_stale
+        self.version = 0
+        # Serialises edits so concurrent requests cannot apply to stale text
+        self.lock = asyncio.Lock()
+
+
+class SessionStore:
+    """Bounded, in-memory LRU of detection sessions with an idle timeout."""
+
+    def __init__(self, max_sessions=1000, ttl=600.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (now + self.ttl, entry[1])
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def put(self, session_id, session):
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic() + self.ttl, session)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
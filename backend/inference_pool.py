@@ -0,0 +1,127 @@
+"""Bounded worker pool that keeps model inference off the asyncio event loop."""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceBusy(Exception):
+    """Raised when the pool already holds ``max_pending`` jobs."""
+
+
+class InferenceTimeout(Exception):
+    """Raised when a job does not finish within the pool timeout."""
+
+
+class InferencePool:
+    """Run a blocking callable in worker threads with backpressure.
+
+    ``max_pending`` caps the jobs that are running or waiting for a worker;
+    further submissions fail immediately with ``InferenceBusy`` instead of
+    queueing without bound. Callers waiting longer than ``timeout`` seconds
+    get ``InferenceTimeout``. The job itself cannot be interrupted, so it
+    keeps its slot until it actually finishes, which keeps the bound honest
+    when the model is slow.
+
+    Threads are used rather than processes: the transformers forward pass
+    releases the GIL, and the weights stay loaded once per worker process.
+    """
+
+    def __init__(self, func, workers=2, max_pending=8, timeout=10.0):
+        self.func = func
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pii-model")
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise InferenceBusy(f"{self.pending} inference jobs pending")
+            self.pending += 1
+
+        try:
+            future = self._executor.submit(self.func, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            # shield() keeps wait_for from cancelling the wrapped future; a
+            # running job cannot be stopped and must release its own slot
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # Only succeeds if the job has not started yet
+            raise InferenceTimeout(f"inference exceeded {self.timeout}s")
+        except asyncio.CancelledError:
+            # The caller no longer wants the result; drop the job if still queued
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-text requests into batched pool jobs.
+
+    Texts submitted within ``max_wait`` seconds of each other (up to
+    ``max_batch_size`` of them) are handed to ``pool`` as one list, so the
+    model runs one padded forward pass instead of one per request. The pool
+    function must accept a list of texts and return one result per text.
+    Pool errors (busy, timeout, model failure) are raised to every request
+    in the affected batch. Requests cancelled before their batch is flushed
+    are left out of it.
+    """
+
+    def __init__(self, pool, max_batch_size=8, max_wait=0.005):
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._waiting = []
+        self._timer = None
+
+    @property
+    def queued(self):
+        """Texts waiting for their batch to be flushed"""
+        return len(self._waiting)
+
+    async def submit(self, text):
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((text, future))
+        if len(self._waiting) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting:
+            batch = self._waiting[:self.max_batch_size]
+            del self._waiting[:self.max_batch_size]
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        # Requests cancelled while waiting (e.g. superseded live text) are not run
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            results = await self.pool.run([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,65 @@
+"""Detection plans: which detectors a request's enabled_labels needs."""
+from regex_detector import DETECTOR_FAMILIES
+
+# Labels clients send in enabled_labels are Piiranha's entity groups. Each
+# one maps to the regex detector families that find the same kind of PII.
+LABEL_DETECTORS = {
+    "ACCOUNTNUM": ("BANK_ACCOUNT",),
+    "BUILDINGNUM": ("ADDRESS",),
+    "CITY": ("ADDRESS",),
+    "CREDITCARDNUMBER": ("CREDIT_CARD",),
+    "DATEOFBIRTH": ("DATE_OF_BIRTH",),
+    "DRIVERLICENSENUM": ("DRIVER_LICENSE",),
+    "EMAIL": ("EMAIL",),
+    "GIVENNAME": ("PERSON",),
+    "IDCARDNUM": ("NRIC", "WORK_PASS"),
+    "PASSWORD": ("PASSWORD",),
+    "SOCIALNUM": ("NRIC",),
+    "STREET": ("ADDRESS",),
+    "SURNAME": ("PERSON",),
+    "TAXNUM": ("TAX_NUMBER",),
+    "TELEPHONENUM": ("PHONE",),
+    "USERNAME": (),
+    "ZIPCODE": ("POSTAL_CODE",),
+}
+
+REGEX_FAMILIES = tuple(family[0] for family in DETECTOR_FAMILIES)
+
+# Regex family -> the labels that need it
+FAMILY_LABELS = {
+    family: tuple(label for label, families in LABEL_DETECTORS.items() if family in families)
+    for family in REGEX_FAMILIES
+}
+
+
+def is_enabled(enabled_labels, label):
+    """Labels are on unless explicitly set to false, as the extension sends them."""
+    return not enabled_labels or enabled_labels.get(label, True) is not False
+
+
+def regex_families(enabled_labels):
+    """
+    Regex families to run for enabled_labels, or None for all of them. A
+    family runs while any of its labels is enabled, unless it is disabled
+    by its own name (e.g. {"PHONE": false}).
+    """
+    if not enabled_labels:
+        return None
+    families = frozenset(
+        family for family in REGEX_FAMILIES
+        if is_enabled(enabled_labels, family)
+        and any(is_enabled(enabled_labels, label) for label in FAMILY_LABELS[family])
+    )
+    return None if len(families) == len(REGEX_FAMILIES) else families
+
+
+def model_enabled(enabled_labels):
+    """Whether any of Piiranha's labels is enabled, i.e. the model is worth running."""
+    return any(is_enabled(enabled_labels, label) for label in LABEL_DETECTORS)
+
+
+def filter_entities(entities, enabled_labels):
+    """Entities whose group is enabled."""
+    if not enabled_labels:
+        return entities
+    return [e for e in entities if is_enabled(enabled_labels, e["entity_group"])]
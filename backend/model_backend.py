@@ -0,0 +1,263 @@
+"""Selectable CPU inference backends for the Piiranha token classifier.
+
+Every backend is a callable taking a list of texts and returning, per text,
+a list of entities in the service format (``start``, ``end``,
+``entity_group``, ``confidence``), grouped as by the transformers
+token-classification pipeline with ``aggregation_strategy="simple"``.
+
+- ``torch``: the fp32 PyTorch model, its logits decoded by decoding.decode.
+- ``int8``: the same, with Linear layers dynamically quantized to int8.
+- ``onnx``: the model exported to ONNX and run by ONNX Runtime.
+- ``onnx-int8``: the exported graph with int8 dynamically quantized weights.
+- ``pipeline``: the fp32 model through the transformers pipeline itself, the
+  reference the others are compared against (compare_backends.py).
+
+The ONNX backends need ``onnxruntime`` (``onnx`` too for exporting). The
+exported graphs are written once to ``onnx_dir`` and reused afterwards.
+"""
+import copy
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from decoding import LabelScheme, decode
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8", "pipeline")
+
+logger = logging.getLogger(__name__)
+
+
+def encode(tokenizer, texts):
+    """
+    Padded batch encoding of texts as NumPy arrays, plus the mask of tokens
+    that are not part of the text: special tokens and padding.
+    """
+    encoding = tokenizer(
+        texts,
+        padding=True,
+        truncation=True,
+        return_offsets_mapping=True,
+        return_special_tokens_mask=True,
+        return_tensors="np"
+    )
+    skip = (encoding["special_tokens_mask"] == 1) | (encoding["attention_mask"] == 0)
+    return encoding, skip
+
+
+class TorchBackend:
+    """PyTorch model run directly on the tokenizer's output."""
+
+    def __init__(self, model, tokenizer):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.scheme = LabelScheme(model.config.id2label)
+
+    def __call__(self, texts):
+        import torch
+
+        encoding, skip = encode(self.tokenizer, texts)
+        with torch.inference_mode():
+            logits = self.model(
+                input_ids=torch.from_numpy(encoding["input_ids"].astype(np.int64)),
+                attention_mask=torch.from_numpy(encoding["attention_mask"].astype(np.int64))
+            ).logits
+        return decode(logits.float().numpy(), encoding["offset_mapping"], skip, self.scheme)
+
+
+class PipelineBackend:
+    """PyTorch model run through the transformers pipeline."""
+
+    def __init__(self, model, tokenizer):
+        from transformers import pipeline
+
+        self.pipeline = pipeline(
+            "token-classification",
+            model=model,
+            tokenizer=tokenizer,
+            aggregation_strategy="simple"
+        )
+
+    def __call__(self, texts):
+        return [[{
+            "start": int(item["start"]),
+            "end": int(item["end"]),
+            "entity_group": str(item["entity_group"]).upper(),
+            "confidence": float(item["score"])
+        } for item in result] for result in self.pipeline(texts, batch_size=len(texts))]
+
+
+class OnnxBackend:
+    """ONNX Runtime session, its logits decoded by decoding.decode."""
+
+    def __init__(self, model_path, tokenizer, id2label, threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = tokenizer
+        self.scheme = LabelScheme(id2label)
+
+    def __call__(self, texts):
+        encoding, skip = encode(self.tokenizer, texts)
+        logits = self.session.run(["logits"], {
+            "input_ids": encoding["input_ids"].astype(np.int64),
+            "attention_mask": encoding["attention_mask"].astype(np.int64)
+        })[0]
+        return decode(logits, encoding["offset_mapping"], skip, self.scheme)
+
+
+def export_onnx(model, path):
+    """Export a token-classification model to ONNX with dynamic batch and length."""
+    import torch
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dummy = torch.ones(1, 8, dtype=torch.long)
+    axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        model.eval(),
+        (dummy, dummy),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": axes},
+        opset_version=17,
+        dynamo=False
+    )
+
+
+def quantize_onnx(source, path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, path, weight_type=QuantType.QInt8)
+
+
+def load_backend(model_name, backend="torch", onnx_dir=None, threads=None):
+    """
+    Load model_name for the given backend. Returns (run_batch, tokenizer,
+    model_config); run_batch takes a list of texts. threads caps the threads
+    one forward pass uses (default: one per core).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    # Imported here so that importing this module stays cheap
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForTokenClassification.from_pretrained(model_name)
+    config = model.config
+    if threads and backend in ("torch", "int8", "pipeline"):
+        import torch
+
+        torch.set_num_threads(threads)
+
+    if backend == "pipeline":
+        return PipelineBackend(model, tokenizer), tokenizer, config
+    if backend == "torch":
+        return TorchBackend(model, tokenizer), tokenizer, config
+    if backend == "int8":
+        import torch
+
+        model = torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+        return TorchBackend(model, tokenizer), tokenizer, config
+
+    revision = getattr(config, "_commit_hash", None) or "local"
+    onnx_dir = onnx_dir or os.path.join(os.path.expanduser("~"), ".cache", "digitaltwin", "onnx")
+    directory = os.path.join(onnx_dir, f"{model_name.replace('/', '--')}@{revision}")
+    path = os.path.join(directory, "model.onnx")
+    if not os.path.exists(path):
+        export_onnx(model, path)
+    if backend == "onnx-int8":
+        quantized = os.path.join(directory, "model-int8.onnx")
+        if not os.path.exists(quantized):
+            quantize_onnx(path, quantized)
+        path = quantized
+    # The PyTorch weights are not needed once the graph exists
+    del model
+    return OnnxBackend(path, tokenizer, config.id2label, threads), tokenizer, config
+
+
+class ModelLoader:
+    """Load a backend in a background thread so the server can start at once.
+
+    ``state`` moves from ``idle`` to ``loading`` to ``ready`` (or ``failed``,
+    with ``error`` set). ``run_batch``, ``tokenizer`` and ``config`` are only
+    set once ready. ``window_tokenizer`` is a private tokenizer copy for use
+    outside the inference threads, which share ``tokenizer``.
+    """
+
+    def __init__(self, model_name, backend="torch", onnx_dir=None, threads=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.threads = threads
+        self.state = "idle"
+        self.error = None
+        self.load_seconds = None
+        self.run_batch = None
+        self.tokenizer = None
+        self.window_tokenizer = None
+        self.config = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def max_tokens(self):
+        """Tokens a single model input can hold, excluding special tokens"""
+        return self.tokenizer.model_max_length - self.tokenizer.num_special_tokens_to_add()
+
+    def start(self):
+        """Start loading unless already started; returns immediately."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = "loading"
+            self._thread = threading.Thread(target=self._load, name="pii-model-loader", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until loading finishes; True when the model is ready."""
+        self.start()
+        self._thread.join(timeout)
+        return self.ready
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            run_batch, tokenizer, config = load_backend(self.model_name, self.backend, self.onnx_dir, self.threads)
+            self.window_tokenizer = copy.deepcopy(tokenizer)
+        except Exception as e:
+            self.load_seconds = time.perf_counter() - started
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+            logger.error(f"❌ Loading {self.model_name} ({self.backend}) failed: {self.error}")
+            return
+        self.load_seconds = time.perf_counter() - started
+        self.tokenizer = tokenizer
+        self.config = config
+        self.run_batch = run_batch
+        self.state = "ready"
+        logger.info(f"✅ Loaded {self.model_name} ({self.backend}) in {self.load_seconds:.1f}s")
+
+    def status(self):
+        status = {
+            "state": self.state,
+            "model": self.model_name,
+            "backend": self.backend,
+            "load_seconds": self.load_seconds
+        }
+        if self.config is not None:
+            status["revision"] = getattr(self.config, "_commit_hash", None) or "local"
+        if self.error:
+            status["error"] = self.error
+        return status
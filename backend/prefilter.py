@@ -0,0 +1,124 @@
+"""Cheap per-text checks run before the regex patterns: family gates and context keywords."""
+import re
+from bisect import bisect_left
+
+from gazetteer import WORD
+
+
+class GatePlan:
+    """Decides, per text, which pattern families can match at all.
+
+    ``gates`` maps a family to regexes (or WordGates) of which at least one
+    must find something for any of its patterns to match (e.g. "has a digit");
+    families without gates always run. Each distinct gate is searched at
+    most once per text, and not at all once every family it gates is
+    already known to be possible.
+
+    IGNORECASE gates must be written in lowercase: on ASCII text they run
+    case-sensitively over the lowercased text, which the regex engine scans
+    several times faster than a case-insensitive alternation.
+    """
+
+    def __init__(self, families, gates):
+        self.ungated = frozenset(family for family in families if family not in gates)
+        checks = {}
+        for family in families:
+            for gate in gates.get(family, ()):
+                checks.setdefault(gate, set()).add(family)
+        self.checks = []
+        for gate, gated in checks.items():
+            twin = None
+            if not isinstance(gate, WordGate) and gate.flags & re.IGNORECASE:
+                twin = re.compile(gate.pattern, gate.flags & ~re.IGNORECASE)
+            self.checks.append((gate, twin, frozenset(gated)))
+
+    def possible(self, census):
+        """Families that may match in the census's text."""
+        possible = self.ungated
+        for gate, twin, gated in self.checks:
+            if gated <= possible:
+                continue
+            if isinstance(gate, WordGate):
+                found = gate.search(census)
+            elif twin is not None and census.ascii:
+                found = twin.search(census.lowered())
+            else:
+                found = gate.search(census.text)
+            if found is not None:
+                possible = possible | gated
+        return possible
+
+
+class WordGate:
+    """Gate passed when the text has any of ``words`` (case-folded) as a whole word."""
+
+    def __init__(self, words):
+        self.words = words
+
+    def search(self, census):
+        return None if self.words.isdisjoint(census.words()) else True
+
+
+class TextCensus:
+    """What a text contains, each part computed on first use.
+
+    ``near`` answers the context keyword checks from keyword positions
+    found once per term instead of lowercasing a window around every match.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.ascii = text.isascii()
+        self._lowered = None
+        self._words = None
+        self._occurrences = {}
+
+    def lowered(self):
+        if self._lowered is None:
+            self._lowered = self.text.lower()
+        return self._lowered
+
+    def words(self):
+        """Set of the text's words (\\w runs), case-folded."""
+        if self._words is None:
+            folded = self.lowered() if self.ascii else self.text.casefold()
+            self._words = set(WORD.findall(folded))
+        return self._words
+
+    def _positions(self, term):
+        positions = self._occurrences.get(term)
+        if positions is None:
+            positions = []
+            find = self._lowered.find
+            i = find(term)
+            while i >= 0:
+                positions.append(i)
+                i = find(term, i + 1)
+            self._occurrences[term] = positions
+        return positions
+
+    def near(self, terms, window, start, end):
+        """
+        Whether any of terms (lowercase) occurs in
+        ``(text[start - window:start] + text[end:end + window]).lower()``.
+        """
+        text = self.text
+        lo = max(0, start - window)
+        hi = end + window
+        lowered = self.lowered()
+        if len(lowered) != len(text):
+            # Lowercasing changed offsets; check the windows directly
+            return any(term in (text[lo:start] + text[end:hi]).lower() for term in terms)
+
+        for term in terms:
+            positions = self._positions(term)
+            i = bisect_left(positions, lo)
+            if i < len(positions) and positions[i] + len(term) <= start:
+                return True
+            i = bisect_left(positions, end)
+            if i < len(positions) and positions[i] + len(term) <= hi:
+                return True
+        # A term straddling the join of the two windows
+        reach = max(map(len, terms)) - 1
+        junction = lowered[max(lo, start - reach):start] + lowered[end:min(hi, end + reach)]
+        return any(term in junction for term in terms)
@@ -0,0 +1,126 @@
+"""Keyed, consistent fake values for detected PII."""
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from faker import Faker
+
+# Entity types that get a fake value; everything else becomes [ENTITY_TYPE]
+FAKERS = {
+    "EMAIL": "email",
+    "PHONE": "phone_number",
+    "PERSON": "name",
+    "SSN": "ssn",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_DIGIT = re.compile(r"\D")
+
+
+def normalize(entity_type, value):
+    """Spelling-insensitive form of value, so variants share one pseudonym"""
+    if entity_type == "PHONE":
+        return _NON_DIGIT.sub("", value)
+    return _WHITESPACE.sub(" ", value.strip()).casefold()
+
+
+class Pseudonymizer:
+    """Map original values to stable fake values.
+
+    The fake value is generated by a Faker instance seeded from a keyed
+    BLAKE2 digest of ``(scope, entity type, normalized value)``, so the same
+    value always gets the same pseudonym under the same secret and scope,
+    while different scopes (users, sessions) get unrelated ones. Generated
+    values are kept in a bounded LRU and, when ``db_path`` is set, in a
+    SQLite table; both are keyed by digest and never hold the original.
+    """
+
+    def __init__(self, secret, max_entries=100_000, db_path=None, locale=None):
+        self._secret = secret
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self._entries = OrderedDict()
+        self._faker = Faker(locale)
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._db = None
+        if db_path:
+            self._db = self._connect()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS pseudonyms (key BLOB PRIMARY KEY, value TEXT NOT NULL)")
+        db.commit()
+        return db
+
+    def reconnect(self):
+        """
+        Open a new store connection in a forked child. A SQLite connection
+        must not be used across fork(), so the inherited one is dropped unclosed.
+        """
+        if self._db is not None:
+            self._db = self._connect()
+
+    def key(self, entity_type, value, scope=""):
+        digest = hashlib.blake2b(key=self._secret, digest_size=16)
+        for part in (scope, entity_type, normalize(entity_type, value)):
+            digest.update(part.encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def fake(self, entity_type, value, scope=""):
+        """Stable fake value for value, or None if entity_type has no faker."""
+        method = FAKERS.get(entity_type)
+        if method is None:
+            return None
+        key = self.key(entity_type, value, scope)
+        with self._lock:
+            fake = self._entries.get(key)
+            if fake is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fake
+
+            self.misses += 1
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM pseudonyms WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.store_hits += 1
+                    fake = row[0]
+            if fake is None:
+                self._faker.seed_instance(int.from_bytes(key[:8], "big"))
+                fake = getattr(self._faker, method)()
+                if self._db is not None:
+                    self._db.execute("INSERT OR IGNORE INTO pseudonyms (key, value) VALUES (?, ?)", (key, fake))
+                    self._db.commit()
+
+            self._entries[key] = fake
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return fake
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "store_hits": self.store_hits,
+                "store": self._db is not None
+            }
+            if self._db is not None:
+                stats["stored"] = self._db.execute("SELECT COUNT(*) FROM pseudonyms").fetchone()[0]
+            return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,730 @@
+"""Precompiled regex detection behind ``detect_basic_pii``."""
+import functools
+import re
+import time
+from collections import namedtuple
+
+from gazetteer import WORD, load as load_gazetteer
+from prefilter import GatePlan, TextCensus, WordGate
+from spans import select_non_overlapping
+
+# Email detection
+EMAIL_PATTERNS = [
+    # Parts bounded by the RFC 5321 limits so runs without an "@" or a
+    # valid domain cannot backtrack across the whole text
+    r'\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,253}\.[A-Z|a-z]{2,63}\b'
+]
+
+# Comprehensive Singapore phone number patterns
+PHONE_PATTERNS = [
+    # Singapore mobile numbers (8/9 prefix)
+    r'\b[89]\d{7}\b',  # 8-digit mobile: 92124222, 81234567
+    r'\b[89]\d{3}[-\s]\d{4}\b',  # With separator: 9212-4222, 8123 4567
+
+    # Singapore landline numbers (6 prefix)
+    r'\b6\d{7}\b',  # 8-digit landline: 61234567
+    r'\b6\d{3}[-\s]\d{4}\b',  # With separator: 6123-4567, 6123 4567
+
+    # With Singapore country code (+65)
+    r'\+65[-\s]?[689]\d{3}[-\s]?\d{4}\b',  # +65-6123-4567, +65 9212 4222
+    r'\+65[-\s]?\d{8}\b',  # +65-92124222, +65 61234567
+
+    # Parentheses format
+    r'\(\+65\)[-\s]?[689]\d{3}[-\s]?\d{4}\b',  # (+65) 9212-4222
+    r'\b\([89]\d{3}\)[-\s]?\d{4}\b',  # (9212) 4222
+
+    # International format variations
+    r'\b65[-\s][689]\d{3}[-\s]\d{4}\b',  # 65-9212-4222, 65 6123 4567
+
+    # Toll-free and special numbers
+    r'\b1800[-\s]?\d{3}[-\s]?\d{4}\b',  # 1800-123-4567 (toll-free)
+    r'\b800[-\s]?\d{3}[-\s]?\d{4}\b',  # 800-123-4567
+
+    # With extension
+    r'\b[689]\d{7}[-\s]?(?:ext|extension|x)[-\s]?\d{2,4}\b'  # 61234567 ext 123
+]
+
+# Singapore name patterns: (pattern, has_capture_group). Names anchored on
+# a surname or given name are GAZETTEER_RULES instead.
+NAME_PATTERNS = [
+    # Names after "I'm" or "I am" - capture group extracts just the name (case-insensitive)
+    (r'(?:I\'m|I am)\s+([A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12}){0,3})', True),
+    # Names after "My name is" - capture group extracts just the name (case-insensitive), stop before "and"
+    # At most 4 words, like every name _is_valid_name accepts
+    (r'(?:my name is|name is)\s+([A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12}){0,3}?)(?=\s+and|\s+or|$|\.|,)', True),
+    # Names after greetings - capture group extracts just the name (2-4 parts)
+    (r'(?:Hi|Hello|Hey|Meet)\s+([A-Z][a-z]{1,12}\s+[A-Z][a-z]{1,12}(?:\s+[A-Z][a-z]{1,12})?(?:\s+[A-Z][a-z]{1,12})?)', True),
+]
+
+# Comprehensive false positive filtering for names (exact match, not contains)
+NAME_FALSE_POSITIVES = frozenset([
+    # Common phrases
+    'thank you', 'good morning', 'good afternoon', 'good evening', 'good night',
+    'how are', 'nice to', 'see you', 'talk to', 'speak to', 'email me',
+    'phone number', 'mobile number', 'contact number', 'telephone number',
+    'user name', 'full name', 'first name', 'last name', 'display name',
+    'company name', 'business name', 'file name', 'folder name',
+    # Geographic locations
+    'united states', 'new york', 'hong kong', 'kuala lumpur', 'penang',
+    'johor bahru', 'singapore city', 'orchard road', 'marina bay',
+    # Time and date related
+    'today', 'tomorrow', 'yesterday', 'monday', 'tuesday', 'wednesday',
+    'thursday', 'friday', 'saturday', 'sunday', 'january', 'february',
+    'march', 'april', 'june', 'july', 'august', 'september', 'october',
+    'november', 'december', 'morning', 'afternoon', 'evening', 'night',
+    # Common words and fillers
+    'the', 'and', 'but', 'for', 'with', 'you', 'are', 'can', 'will', 'have',
+    'this', 'that', 'what', 'when', 'where', 'why', 'how', 'who', 'which',
+    'would', 'could', 'should', 'might', 'must', 'shall', 'may', 'need',
+    'make', 'take', 'give', 'tell', 'ask', 'work', 'play', 'help', 'want',
+    'about', 'from', 'they', 'them', 'were', 'been', 'said', 'each', 'she',
+    'their', 'time', 'very', 'after', 'first', 'well', 'year', 'name',
+    # Technology and business terms
+    'email', 'password', 'account', 'login', 'logout', 'signin', 'signup',
+    'website', 'internet', 'google', 'facebook', 'twitter', 'instagram',
+    'whatsapp', 'telegram', 'linkedin', 'youtube', 'microsoft', 'apple',
+    # Singapore context that aren't names
+    'singapore', 'nric', 'passport', 'address', 'postal code', 'zip code',
+    'street', 'road', 'avenue', 'lane', 'block', 'unit', 'floor'
+])
+
+# Words that on their own never make a phrase look like a person name
+COMMON_NAME_WORDS = frozenset([
+    'the', 'and', 'of', 'to', 'a', 'in', 'for', 'is', 'on', 'that', 'by', 'this',
+    'with', 'you', 'it', 'not', 'or', 'be', 'are', 'was', 'born', 'my', 'name',
+    'phone', 'number', 'email', 'address'
+])
+
+# Substring checks applied to names without any likely-name indicator
+EXTENDED_NAME_FALSE_POSITIVES = (
+    'phone number', 'mobile number', 'email address', 'today tomorrow',
+    'good morning', 'thank you', 'how are', 'see you', 'talk to'
+)
+
+# Singapore NRIC (National Registration Identity Card)
+NRIC_PATTERNS = [
+    r'\b[STFG]\d{7}[A-Z]\b',  # Standard Singapore NRIC format (S1234567A)
+    r'\b[stfg]\d{7}[a-z]\b',  # Lowercase version
+    r'\b[STFGstfg]\d{7}[A-Za-z]\b'  # Mixed case
+]
+
+# Comprehensive credit card patterns
+CREDIT_CARD_PATTERNS = [
+    # Visa (starts with 4, 16 digits)
+    r'\b4\d{3}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 4123-4567-8901-2345
+    r'\b4\d{15}\b',  # 4123456789012345 (no separators)
+
+    # Mastercard (starts with 5, 16 digits)
+    r'\b5[1-5]\d{2}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 5123-4567-8901-2345
+    r'\b5[1-5]\d{14}\b',  # 5123456789012345
+
+    # American Express (starts with 34/37, 15 digits)
+    r'\b3[47]\d{2}[-\s]?\d{6}[-\s]?\d{5}\b',  # 3712-345678-90123
+    r'\b3[47]\d{13}\b',  # 371234567890123
+
+    # Discover (starts with 6, 16 digits)
+    r'\b6(?:011|5\d{2})[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 6011-1234-5678-9012
+    r'\b6(?:011|5\d{2})\d{12}\b',  # 6011123456789012
+
+    # Generic patterns (various lengths)
+    r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',  # 16-digit with separators
+    r'\b\d{4}[-\s]?\d{6}[-\s]?\d{5}\b',  # 15-digit with separators
+    r'\b\d{16}\b',  # 16 consecutive digits
+    r'\b\d{15}\b',  # 15 consecutive digits
+
+    # With dots as separators
+    r'\b\d{4}\.\d{4}\.\d{4}\.\d{4}\b',  # 4123.4567.8901.2345
+    r'\b\d{4}\.\d{6}\.\d{5}\b'  # 3712.345678.90123
+]
+
+# Singapore Driver's License Numbers
+LICENSE_PATTERNS = [
+    r'\b[A-Z]\d{7,8}[A-Z]?\b',  # Singapore format similar to NRIC but for licenses
+    r'\bSPDL\d{6,8}\b'  # Singapore Police Driving License format (if applicable)
+]
+
+# Bank Account Numbers
+BANK_PATTERNS = [
+    r'\b\d{8,17}\b',  # 8-17 digit account numbers
+    r'\b\d{4}[-\s]\d{4}[-\s]\d{4}[-\s]\d{4,8}\b'  # Formatted account numbers
+]
+
+# Comprehensive Singapore address patterns
+# Free-text runs ([A-Za-z0-9\s]{m,n}) already take whitespace, so they are
+# delimited by a single \s rather than \s+, and other whitespace gaps are
+# bounded: an unbounded \s+ next to such a run backtracks through every way
+# of splitting a long whitespace run, which is superlinear in its length.
+ADDRESS_PATTERNS = [
+    # Singapore street addresses with various formats
+    r'\b\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{2,50}\s(Road|Rd|Street|St|Avenue|Ave|Drive|Dr|Lane|Ln|Close|Crescent|Walk|Park|Gardens?|Heights?|View|Terrace|Place|Plaza|Way|Circuit|Link|Grove)\b',
+
+    # HDB block addresses - various formats
+    r'\b(?:Blk|Block)\s{1,5}\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{3,50}(?:\s{1,5}(?:Street|St|Road|Rd|Avenue|Ave|Lane|Ln|Drive|Dr|Close|Crescent|Walk))?\b',
+    r'\b(?:Block|Blk)\.?\s{1,5}\d{1,4}[A-Z]?,?\s[A-Za-z0-9\s,]{5,60}\b',
+
+    # With unit numbers - various formats
+    r'\b\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{2,40}\s(?:Road|Rd|Street|St|Avenue|Ave|Drive|Dr)\s{0,5},?\s{0,5}#\d{2}-\d{2,4}\b',
+    r'\b\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{2,40}\s(?:Road|Rd|Street|St|Avenue|Ave)\s{0,5},?\s{0,5}(?:Unit|Apt|Apartment)\s{0,5}\d{1,4}[-]?\d{0,4}\b',
+    r'\b\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{2,40}\s(?:Road|Rd|Street|St|Avenue|Ave)\s{0,5},?\s{0,5}Level\s{0,5}\d{1,3}\b',
+
+    # Shopping centers and buildings
+    r'\b[A-Za-z0-9\s]{3,40}\s(?:Shopping Centre|Shopping Center|Mall|Tower|Building|Complex|Plaza|Centre|Center)\b',
+    r'\b\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{3,40}\s(?:Building|Tower|Centre|Center|Complex)\b',
+
+    # Condominium and private housing
+    r'\b[A-Za-z0-9\s]{3,50}\s(?:Condominium|Condo|Residences?|Court|Manor|Villa|Estate)\b',
+
+    # PO Box variations
+    r'\b(?:P\.?O\.?\s*Box|Post\s+Office\s+Box|POB)\s+\d{1,6}\b',
+
+    # General format with comma separation
+    r'\b\d{1,4}[A-Z]?\s[A-Za-z0-9\s]{5,50},\s[A-Za-z\s]{3,30},?\s{1,5}Singapore\b'
+]
+
+# Address patterns that open with a free-text run ``[A-Za-z0-9\s]{3,N}\s``
+# before a keyword: pattern index -> (keyword alternation, N). These can only
+# start shortly before a whitespace-preceded keyword, so they are tried there
+# instead of at every word boundary of the text.
+ADDRESS_KEYWORD_WINDOWS = {
+    6: (r'Shopping Centre|Shopping Center|Mall|Tower|Building|Complex|Plaza|Centre|Center', 40),
+    8: (r'Condominium|Condo|Residences?|Court|Manor|Villa|Estate', 50),
+}
+
+# Singapore postal codes (6-digit format)
+POSTAL_PATTERNS = [
+    r'\b\d{6}\b',  # Singapore postal codes (098765)
+    r'\bSingapore\s+\d{6}\b'  # "Singapore 098765" format
+]
+
+# Comprehensive date patterns for birth dates
+DOB_PATTERNS = [
+    # Numeric formats
+    r'\b\d{1,2}/\d{1,2}/\d{4}\b',  # DD/MM/YYYY or MM/DD/YYYY
+    r'\b\d{1,2}-\d{1,2}-\d{4}\b',  # DD-MM-YYYY or MM-DD-YYYY
+    r'\b\d{4}/\d{1,2}/\d{1,2}\b',  # YYYY/MM/DD
+    r'\b\d{4}-\d{1,2}-\d{1,2}\b',  # YYYY-MM-DD
+    r'\b\d{1,2}\.\d{1,2}\.\d{4}\b',  # DD.MM.YYYY
+
+    # Written month formats (full names)
+    r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',  # January 15, 1990
+    r'\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\b',  # 15 January 1990
+
+    # Abbreviated month formats
+    r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\.?\s+\d{1,2},?\s+\d{4}\b',  # Jan 15, 1990 or Jan. 15, 1990
+    r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\.?\s+\d{4}\b',  # 15 Jan 1990 or 15 Jan. 1990
+
+    # Ordinal date formats
+    r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th),?\s+\d{4}\b',  # January 1st, 1990
+    r'\b\d{1,2}(?:st|nd|rd|th)\s+(?:of\s+)?(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\b',  # 1st of January 1990
+
+    # Casual date formats
+    r'\b(?:born\s+(?:on\s+)?)(\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4})\b',  # born on 1 January 1990
+    r'\b(?:birthday\s+(?:is\s+)?(?:on\s+)?)(\d{1,2}/\d{1,2}/\d{4})\b'  # birthday is on 01/01/1990
+]
+
+# Singapore Work Pass and Foreign ID Numbers
+FOREIGN_ID_PATTERNS = [
+    r'\b[FGM]\d{7}[A-Z]\b',  # Foreign ID in Singapore (F1234567A, G1234567B, M1234567C)
+    r'\bWP\d{8}\b',  # Work Permit numbers
+    r'\bEP\d{8}\b',  # Employment Pass numbers
+    r'\bDP\d{8}\b'   # Dependant Pass numbers
+]
+
+# Tax Numbers
+TAX_PATTERNS = [
+    r'\b\d{2}-\d{7}\b',  # EIN format
+    r'\b\d{3}-\d{2}-\d{4}\b'  # Also catches SSN used as tax ID
+]
+
+# Passwords (basic patterns - look for context)
+PASSWORD_PATTERNS = [
+    r'(?:password|pwd|pass)\s*[:=]\s*([A-Za-z0-9@#$%^&*!]{6,})',
+    r'(?:password|pwd|pass)\s+is\s+([A-Za-z0-9@#$%^&*!]{6,})'
+]
+
+# Detector families in the order their entities were historically emitted.
+# Each entry: (entity_group, confidence, patterns, flags, span_group, context)
+# where span_group selects the capture group reported as the entity and
+# context is (terms, window) for families that need nearby keywords.
+DETECTOR_FAMILIES = [
+    ("EMAIL", 0.9, EMAIL_PATTERNS, 0, 0, None),
+    ("PHONE", 0.8, PHONE_PATTERNS, 0, 0, None),
+    ("PERSON", 0.8, NAME_PATTERNS, re.IGNORECASE, 1, None),
+    ("NRIC", 0.95, NRIC_PATTERNS, 0, 0, None),
+    ("CREDIT_CARD", 0.9, CREDIT_CARD_PATTERNS, 0, 0, None),
+    ("DRIVER_LICENSE", 0.85, LICENSE_PATTERNS, 0, 0,
+     (('license', 'licence', 'dl', 'driver', 'driving', 'singapore'), 25)),
+    ("BANK_ACCOUNT", 0.8, BANK_PATTERNS, 0, 0,
+     (('account', 'bank', 'routing', 'iban'), 30)),
+    ("ADDRESS", 0.85, ADDRESS_PATTERNS, re.IGNORECASE, 0, None),
+    ("POSTAL_CODE", 0.85, POSTAL_PATTERNS, re.IGNORECASE, 0,
+     (('postal', 'code', 'singapore', 'address', 'zip'), 25)),
+    ("DATE_OF_BIRTH", 0.85, DOB_PATTERNS, re.IGNORECASE, 0,
+     (('birth', 'born', 'dob', 'birthday'), 30)),
+    ("WORK_PASS", 0.85, FOREIGN_ID_PATTERNS, 0, 0,
+     (('id', 'identity', 'card', 'work', 'permit', 'pass', 'employment', 'singapore'), 25)),
+    ("TAX_NUMBER", 0.85, TAX_PATTERNS, 0, 0,
+     (('tax', 'ein', 'itin'), 20)),
+    ("PASSWORD", 0.9, PASSWORD_PATTERNS, re.IGNORECASE, 1, None),
+]
+
+# Rules matched against the gazetteer (gazetteer.py) rather than as regex
+# alternations over its word lists, in one pass over the words of the text.
+# Each entry: (entity_group, confidence, kind), where kind is one of
+#   "name_first": a surname or given name, then one or two name words
+#   "name_last": a name word, then a surname or given name
+#   "numbered_place": a house or block number, then a street or estate
+# Name words are 2-13 letters and numbers are \d{1,4}[A-Z]?, as in the
+# regex patterns these rules replaced; words are separated by whitespace.
+GAZETTEER_RULES = [
+    ("PERSON", 0.8, "name_first"),
+    ("PERSON", 0.8, "name_last"),
+    ("ADDRESS", 0.85, "numbered_place"),
+]
+NAME_CATEGORIES = ("surnames", "given_names")
+PLACE_CATEGORIES = ("streets", "estates")
+_NAME_WORD = re.compile(r'[A-Z][a-z]{1,12}', re.IGNORECASE)
+_NUMBER_THEN_SPACE = re.compile(r'\b\d{1,4}[A-Z]?\s+', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=4096)
+def _whole_word(word, ascii_text):
+    """Regex finding word where a word ends; ASCII texts are searched lowercased."""
+    return re.compile(re.escape(word) + r'(?!\w)', 0 if ascii_text else re.IGNORECASE)
+
+
+def _is_word_char(char):
+    # What \w matches in a str pattern
+    return char.isalnum() or char == '_'
+
+
+def _word_start(text, pos):
+    return pos == 0 or not _is_word_char(text[pos - 1])
+
+
+def _name_words_after(text, pos):
+    """End of one or two name words following whitespace at pos, or None."""
+    end = None
+    for _ in range(2):
+        gap = _SPACES.match(text, pos)
+        word = gap and WORD.match(text, gap.end())
+        if not word or not _NAME_WORD.fullmatch(word.group()):
+            break
+        end = pos = word.end()
+    return end
+
+
+def _name_word_before(text, pos):
+    """Start of a name word separated from pos by whitespace only, or None."""
+    end = pos
+    while end > 0 and text[end - 1].isspace():
+        end -= 1
+    if end == pos:
+        return None
+    start = end
+    # A name word has at most 13 characters; look one further to see the run ends
+    while start > 0 and end - start <= 13 and _is_word_char(text[start - 1]):
+        start -= 1
+    if not _word_start(text, start) or not _NAME_WORD.fullmatch(text, start, end):
+        return None
+    return start
+
+_SIX_DIGITS = re.compile(r'\d{6}')
+
+# Necessary conditions for each family to match anything: family -> gate
+# regexes, at least one of which must find something in the text. Families
+# without a gate always run. A chat message without digits, "@", password
+# keywords, address keywords, name triggers or gazetteer names runs no
+# pattern; the gazetteer name gate is added per detector, which may have
+# its own gazetteer.
+_DIGIT = re.compile(r'\d')
+_NAME_TRIGGERS = re.compile(r"(?:i'm|i am|name is|hi|hello|hey|meet)\s", re.IGNORECASE)
+FAMILY_GATES = {
+    "EMAIL": (re.compile('@'),),
+    "PHONE": (_DIGIT,),
+    "PERSON": (_NAME_TRIGGERS,),
+    "NRIC": (_DIGIT,),
+    "CREDIT_CARD": (_DIGIT,),
+    "DRIVER_LICENSE": (_DIGIT,),
+    "BANK_ACCOUNT": (_DIGIT,),
+    # Only the keyword-anchored address patterns can match without a digit
+    "ADDRESS": (_DIGIT, re.compile('|'.join(k for k, _ in ADDRESS_KEYWORD_WINDOWS.values()).lower(), re.IGNORECASE)),
+    "POSTAL_CODE": (_DIGIT,),
+    "DATE_OF_BIRTH": (_DIGIT,),
+    "WORK_PASS": (_DIGIT,),
+    "TAX_NUMBER": (_DIGIT,),
+    "PASSWORD": (re.compile('pass|pwd', re.IGNORECASE),),
+}
+
+# Restricted detectors shared by a detector and those it built (one per
+# distinct family set)
+MAX_RESTRICTED = 256
+
+# A single compiled pattern together with how its matches become entities
+_Rule = namedtuple('_Rule', 'entity_group confidence regex span_group context order')
+
+
+class RegexTimeout(Exception):
+    """detect ran past its budget; ``entities`` are those found until then."""
+
+    def __init__(self, budget, entities):
+        super().__init__(f"regex detection exceeded its {budget * 1000:.0f} ms budget")
+        self.entities = entities
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class _Deadline:
+    """Time budget of one detect call. Compiling patterns on first use
+    doesn't count against it, or a cold detector would time out."""
+
+    def __init__(self, seconds):
+        self.at = time.monotonic() + seconds
+
+    def check(self):
+        if time.monotonic() > self.at:
+            raise _OutOfTime
+
+
+class _CombinedScanner:
+    """One alternation over many patterns that reports which pattern fired.
+
+    Every alternative ends in an empty named group, so ``lastindex`` of a
+    match identifies the pattern. The marker sits at the end rather than
+    wrapping the alternative so the engine can still reject alternatives on
+    their first character. ``alternatives(i)`` returns a scanner over
+    patterns ``i..n`` only; those suffix scanners are compiled on first use.
+    """
+
+    def __init__(self, entries, prefix):
+        self.prefix = prefix
+        self.bodies = []
+        for body, flags, _ in entries:
+            if flags & re.IGNORECASE:
+                body = '(?i:' + body + ')'
+            self.bodies.append(body)
+        self.rules = [rule for _, _, rule in entries]
+        self._suffixes = [None] * len(entries)
+
+    def alternatives(self, first, deadline=None):
+        """Return ``(regex, markers)`` for patterns ``first..n``.
+
+        ``markers`` maps a marker group to ``(rule index, first group of the
+        rule)``.
+        """
+        compiled = self._suffixes[first]
+        if compiled is None:
+            started = time.monotonic()
+            alternatives = [
+                '%s(?P<r%d>)' % (self.bodies[index], index)
+                for index in range(first, len(self.bodies))
+            ]
+            regex = re.compile(self.prefix + '(?:' + '|'.join(alternatives) + ')')
+            markers = {}
+            for index in range(first, len(self.rules)):
+                marker = regex.groupindex['r%d' % index]
+                # The pattern's own groups are numbered just before its marker
+                markers[marker] = (index, marker - self.rules[index].regex.groups)
+            compiled = self._suffixes[first] = (regex, markers)
+            if deadline is not None:
+                deadline.at += time.monotonic() - started
+        return compiled
+
+
+class RegexPIIDetector:
+    """Regex PII detector compiled once and reused for every request.
+
+    Patterns are merged into two combined scanners: one for patterns that
+    open with a word boundary (the shared ``\\b`` is factored out so the
+    engine only tries alternatives at word starts) and one for the handful
+    that do not. The two free-text address patterns are only tried just
+    before their keywords. Every pattern still yields exactly the matches
+    ``re.finditer`` would give it on its own, so the output is unchanged.
+    Names and places from the gazetteer are matched word by word in a
+    separate pass (see GAZETTEER_RULES).
+
+    ``families`` limits the detector to those entity groups; patterns of
+    other families are not compiled into its scanners at all. ``gazetteer``
+    defaults to the word lists shipped in gazetteer/.
+    """
+
+    def __init__(self, families=None, gazetteer=None, _restricted=None):
+        self.gazetteer = gazetteer if gazetteer is not None else load_gazetteer()
+        all_families = frozenset(family[0] for family in DETECTOR_FAMILIES)
+        self.families = all_families if families is None else frozenset(families)
+        self._restricted = {} if _restricted is None else _restricted
+        self.names = self.gazetteer.mask(*NAME_CATEGORIES)
+        self.places = self.gazetteer.mask(*PLACE_CATEGORIES)
+        self.name_words = self.gazetteer.words(self.names)
+        gates = dict(FAMILY_GATES)
+        gates["PERSON"] += (WordGate(self.gazetteer.first_words(self.names)),)
+        self.gate_plan = GatePlan(self.families, gates)
+
+        boundary_rules = []
+        other_rules = []
+        self.windowed_rules = []
+        for family_index, family in enumerate(DETECTOR_FAMILIES):
+            entity_group, confidence, patterns, flags, span_group, context = family
+            if entity_group not in self.families:
+                continue
+            for pattern_index, pattern in enumerate(patterns):
+                group = span_group
+                if isinstance(pattern, tuple):
+                    pattern, has_capture_group = pattern
+                    group = 1 if has_capture_group else 0
+                rule = _Rule(entity_group, confidence, re.compile(pattern, flags),
+                             group, context, (family_index, pattern_index))
+
+                if entity_group == "ADDRESS" and pattern_index in ADDRESS_KEYWORD_WINDOWS:
+                    keywords, max_prefix = ADDRESS_KEYWORD_WINDOWS[pattern_index]
+                    # Consume only the whitespace so overlapping keywords
+                    # ("Shopping Centre" / "Centre") are all found
+                    anchor = re.compile(r'\s(?=(?:' + keywords + r')\b)', flags)
+                    self.windowed_rules.append((anchor, max_prefix, rule))
+                elif pattern.startswith(r'\b'):
+                    boundary_rules.append((pattern[2:], flags, rule))
+                else:
+                    other_rules.append((pattern, flags, rule))
+
+        self.scanners = [
+            _CombinedScanner(rules, prefix)
+            for rules, prefix in ((boundary_rules, r'\b'), (other_rules, ''))
+            if rules
+        ]
+        for scanner in self.scanners:
+            scanner.alternatives(0)
+
+        # The rule order follows the family's regex patterns
+        pattern_counts = {family[0]: (index, len(family[2])) for index, family in enumerate(DETECTOR_FAMILIES)}
+        self.gazetteer_rules = {}
+        for entity_group, confidence, kind in GAZETTEER_RULES:
+            if entity_group in self.families:
+                family_index, count = pattern_counts[entity_group]
+                pattern_counts[entity_group] = (family_index, count + 1)
+                self.gazetteer_rules[kind] = _Rule(entity_group, confidence, None, 0, None,
+                                                   (family_index, count))
+
+    def restricted(self, families):
+        """Detector running only ``families`` (None: all), built on first use."""
+        if families is None:
+            return self
+        families = frozenset(families)
+        if families == self.families:
+            return self
+        detector = self._restricted.get(families)
+        if detector is None:
+            if len(self._restricted) >= MAX_RESTRICTED:
+                self._restricted.pop(next(iter(self._restricted)))
+            detector = self._restricted[families] = RegexPIIDetector(families, self.gazetteer, self._restricted)
+        return detector
+
+    def _scan(self, scanner, text, candidates, census, deadline):
+        """Collect every per-pattern ``finditer`` match of ``scanner``."""
+        rules = scanner.rules
+        # Position each pattern may next match at, mirroring finditer's
+        # non-overlapping scan of that pattern on its own
+        next_pos = [0] * len(rules)
+        regex, first_markers = scanner.alternatives(0)
+        search = regex.search
+        pos = 0
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return
+            if deadline is not None:
+                deadline.check()
+            start = match.start()
+            markers = first_markers
+            while match is not None:
+                index, first_group = markers[match.lastindex]
+                rule = rules[index]
+                if next_pos[index] <= start:
+                    end = match.end()
+                    next_pos[index] = end
+                    if rule.span_group and match.group(first_group):
+                        self._accept(rule, text, match.start(first_group), match.end(first_group),
+                                     candidates, census)
+                    else:
+                        self._accept(rule, text, start, end, candidates, census)
+                if index + 1 == len(rules):
+                    break
+                # Later alternatives may match at the same position too
+                regex, markers = scanner.alternatives(index + 1, deadline)
+                match = regex.match(text, start)
+            pos = start + 1
+
+    def _scan_windows(self, anchor, max_prefix, rule, text, candidates, census, deadline):
+        """Collect ``finditer`` matches of a keyword-terminated address rule.
+
+        A match starting at ``q`` is a run of at most ``max_prefix`` characters,
+        one whitespace character and then the keyword, so ``q`` lies between
+        ``max_prefix + 1`` and four characters before the keyword. Only those
+        start positions are tried, in increasing order.
+        """
+        match_at = rule.regex.match
+        next_pos = 0
+        for hit in anchor.finditer(text):
+            if deadline is not None:
+                deadline.check()
+            keyword_start = hit.end()
+            pos = max(next_pos, keyword_start - 1 - max_prefix)
+            while pos <= keyword_start - 4:
+                match = match_at(text, pos)
+                if match is None:
+                    pos += 1
+                    continue
+                self._accept(rule, text, pos, match.end(), candidates, census)
+                pos = next_pos = match.end()
+            next_pos = max(next_pos, pos)
+
+    def _scan_gazetteer(self, text, candidates, census, deadline):
+        """Collect matches of GAZETTEER_RULES, each rule's not overlapping one
+        another as with ``finditer``.
+
+        Only words that can start a match are visited: the text's word set
+        (one ``findall``) is intersected with the gazetteer's first words, and
+        only the words in common are searched for.
+        """
+        rules = self.gazetteer_rules
+        gazetteer = self.gazetteer
+        name_first = rules.get("name_first")
+        name_last = rules.get("name_last")
+        if name_first or name_last:
+            present = census.words() & gazetteer.first_words(self.names)
+            source = census.lowered() if census.ascii else text
+            starts = sorted(
+                hit.start() for word in present
+                for hit in _whole_word(word, census.ascii).finditer(source)
+                if _word_start(text, hit.start())
+            )
+            next_first = next_last = 0
+            for start in starts:
+                if deadline is not None:
+                    deadline.check()
+                ends = gazetteer.ends(text, start, self.names)
+                if not ends:
+                    continue
+                if name_first and start >= next_first:
+                    # Like a regex alternation, fall back to shorter entries
+                    for end in reversed(ends):
+                        end = _name_words_after(text, end)
+                        if end is not None:
+                            self._accept(name_first, text, start, end, candidates, census)
+                            next_first = end
+                            break
+                if name_last:
+                    before = _name_word_before(text, start)
+                    if before is not None and before >= next_last:
+                        self._accept(name_last, text, before, ends[-1], candidates, census)
+                        next_last = ends[-1]
+
+        numbered_place = rules.get("numbered_place")
+        if numbered_place and not census.words().isdisjoint(gazetteer.first_words(self.places)):
+            next_place = 0
+            for number in _NUMBER_THEN_SPACE.finditer(text):
+                start = number.start()
+                if start < next_place:
+                    continue
+                if deadline is not None:
+                    deadline.check()
+                ends = gazetteer.ends(text, number.end(), self.places)
+                if ends:
+                    self._accept(numbered_place, text, start, ends[-1], candidates, census)
+                    next_place = ends[-1]
+
+    def _accept(self, rule, text, start, end, candidates, census):
+        entity_group = rule.entity_group
+        confidence = rule.confidence
+
+        if entity_group == "PERSON":
+            name_text = text[start:end]
+            if not self._is_valid_name(name_text):
+                return
+            confidence = 0.8 if ' ' in name_text else 0.6  # Lower confidence for single names
+        elif entity_group == "POSTAL_CODE" and 'Singapore' in text[start:end]:
+            # Extract just the 6-digit code
+            digits_match = _SIX_DIGITS.search(text, start, end)
+            if digits_match:
+                start, end = digits_match.span()
+        elif rule.context is not None:
+            terms, window = rule.context
+            if not census.near(terms, window, start, end):
+                return
+
+        candidates.append((-(end - start), start, rule.order, {
+            "start": start,
+            "end": end,
+            "entity_group": entity_group,
+            "confidence": confidence
+        }))
+
+    def _is_valid_name(self, name_text):
+        name_lower = name_text.lower().strip()
+        name_parts = name_text.split()
+
+        # More flexible validation for Singapore names
+        is_valid_name = (
+            len(name_lower) >= 3 and  # At least 3 characters
+            name_lower not in NAME_FALSE_POSITIVES and
+            not name_text.isdigit() and
+            name_text.replace(' ', '').isalpha() and  # Only alphabetic characters and spaces
+            (' ' in name_text or len(name_parts) == 1) and  # Single names OK for contextual matches
+            1 <= len(name_parts) <= 4  # Between 1 and 4 parts
+        )
+        if not is_valid_name:
+            return False
+
+        # Each part must be 1-15 characters (more flexible)
+        if any(len(part) > 15 for part in name_parts):
+            return False
+
+        # Check if it's likely a person name vs. common phrase
+        lowered_parts = [part.lower() for part in name_parts]
+        if (any(part in self.name_words for part in lowered_parts) or
+                all(part[0].isupper() for part in name_parts) or
+                not all(part in COMMON_NAME_WORDS for part in lowered_parts)):
+            return True
+
+        # Without any indicator, be more strict about false positives
+        return not any(fp in name_lower for fp in EXTENDED_NAME_FALSE_POSITIVES)
+
+    def detect(self, text, budget=None):
+        """Return non-overlapping regex PII entities in ``text`` sorted by start.
+
+        With a budget (seconds), raise RegexTimeout once it is spent. The
+        clock is checked between matches, so a single search can overrun it,
+        but only by time linear in the text length: ``benchmark.py scaling``
+        checks that no pattern backtracks superlinearly.
+        """
+        census = TextCensus(text)
+        families = self.gate_plan.possible(census)
+        if not families:
+            return []
+        detector = self.restricted(families)
+        # Started after restricted(), whose first use compiles the patterns
+        deadline = None if budget is None else _Deadline(budget)
+
+        candidates = []
+        try:
+            for scanner in detector.scanners:
+                detector._scan(scanner, text, candidates, census, deadline)
+            for anchor, max_prefix, rule in detector.windowed_rules:
+                detector._scan_windows(anchor, max_prefix, rule, text, candidates, census, deadline)
+            if detector.gazetteer_rules:
+                detector._scan_gazetteer(text, candidates, census, deadline)
+        except _OutOfTime:
+            raise RegexTimeout(budget, self._select(candidates)) from None
+        return self._select(candidates)
+
+    @staticmethod
+    def _select(candidates):
+        # Remove duplicate/overlapping entities (prefer longer, more specific matches)
+        candidates.sort(key=lambda candidate: candidate[:3])
+        filtered_entities = select_non_overlapping(candidate[3] for candidate in candidates)
+
+        # Final sort by position for consistent output
+        filtered_entities.sort(key=lambda x: x['start'])
+        return filtered_entities
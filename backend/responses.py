@@ -0,0 +1,48 @@
+"""Compact encodings of detection responses."""
+from fastapi.responses import JSONResponse, Response
+
+# Entity fields sent as columns in compact responses, one list per field
+COLUMNS = ("start", "end", "entity_group", "confidence")
+
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def columnar(entities, columns=COLUMNS):
+    """Entities as {field: [value per entity]}, in entity order; None where a field is missing."""
+    return {column: [entity.get(column) for entity in entities] for column in columns}
+
+
+def wants_msgpack(accept):
+    """Whether an Accept header asks for MessagePack rather than JSON."""
+    if not accept:
+        return False
+    return any(part.split(";")[0].strip().lower() in _MSGPACK_TYPES for part in accept.split(","))
+
+
+class MsgPackResponse(Response):
+    """Response encoded with MessagePack (the optional msgpack package)."""
+    media_type = MSGPACK
+
+    def render(self, content):
+        import msgpack
+
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def msgpack_available():
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compact_response(content, accept=None):
+    """
+    content as MessagePack when accept asks for it, otherwise as JSON. Both
+    skip FastAPI's per-field encoding, so content must hold plain types only.
+    """
+    if wants_msgpack(accept):
+        return MsgPackResponse(content)
+    return JSONResponse(content=content)
@@ -0,0 +1,71 @@
+"""
+Anonymize a large file or stdin record by record, writing results as it goes.
+
+    python scrub.py export.ndjson -o clean.ndjson
+    zcat logs.txt.gz | python scrub.py --format text --mode placeholder > clean.txt
+
+Records are NDJSON lines (the --field of each object, or bare JSON strings)
+or plain text lines. Each output line matches one input line, and memory
+stays flat whatever the input size.
+"""
+import argparse
+import logging
+import sys
+
+from streaming import FORMATS, LineSplitter
+
+CHUNK_SIZE = 64 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout (default)")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--mode", choices=("fake", "placeholder"), default="fake",
+                        help="fake data like /replace_with_fake, or [ENTITY_GROUP] placeholders")
+    parser.add_argument("--field", default="text", help="NDJSON field holding the text")
+    parser.add_argument("--entities", action="store_true", help="add detected entities to NDJSON records")
+    parser.add_argument("--no-model", action="store_true", help="regex detection only")
+    args = parser.parse_args()
+
+    # The app logs every request at INFO; only warnings matter here
+    logging.basicConfig(level=logging.WARNING)
+    import app
+
+    run_model = None
+    if not args.no_model:
+        if not app.model_loader.wait():
+            sys.exit(f"Model failed to load: {app.model_loader.error}")
+        run_model = app.model_loader.run_batch
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    splitter = LineSplitter(app.STREAM_MAX_LINE)
+    records = 0
+
+    def write(batch):
+        sink.writelines(app.anonymize_lines(batch, args.format, args.mode, args.field, args.entities, run_model))
+        sink.flush()
+
+    with source, sink:
+        pending = []
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            pending.extend(splitter.feed(chunk))
+            while len(pending) >= app.BULK_BATCH_SIZE:
+                write(pending[:app.BULK_BATCH_SIZE])
+                del pending[:app.BULK_BATCH_SIZE]
+                records += app.BULK_BATCH_SIZE
+        pending.extend(splitter.close())
+        for i in range(0, len(pending), app.BULK_BATCH_SIZE):
+            write(pending[i:i + app.BULK_BATCH_SIZE])
+        records += len(pending)
+
+    print(f"{records} lines processed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
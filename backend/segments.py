@@ -0,0 +1,48 @@
+"""Splitting texts into sentences or lines, the units model results are cached by."""
+import re
+
+MODES = ("sentences", "lines", "off")
+
+_LINE_BREAK = re.compile(r"\s*\n\s*")
+_SENTENCE_BREAK = re.compile(r"\s*\n\s*|(?<=[.!?])\s+")
+_WORD_BEFORE_DOT = re.compile(r"(\w+)\.$")
+
+# Words whose trailing "." doesn't end a sentence: titles, address parts
+# and the like, which the model needs to see together with what follows
+ABBREVIATIONS = frozenset("""
+    mr mrs ms mdm dr prof st no blk ave rd jln lor bt upp sgt capt col gen lt
+    eg ie etc vs co inc ltd pte jr sr
+""".split())
+
+
+def segment_spans(text, mode="sentences"):
+    """
+    (start, end) of the segments of text, in order and without their
+    surrounding whitespace. "lines" splits at line breaks; "sentences" also
+    after ".", "!" or "?" followed by whitespace, except after an initial
+    or one of ABBREVIATIONS. "off" returns the whole text as one segment.
+    """
+    if mode == "off":
+        return [(0, len(text))] if text else []
+    breaks = _LINE_BREAK if mode == "lines" else _SENTENCE_BREAK
+    spans = []
+    start = 0
+    for match in breaks.finditer(text):
+        if text[match.start() - 1] == "." and "\n" not in match.group():
+            word = _WORD_BEFORE_DOT.search(text, max(0, match.start() - 8), match.start())
+            if word is not None and (len(word.group(1)) == 1 or word.group(1).lower() in ABBREVIATIONS):
+                continue
+        if match.start() > start:
+            spans.append((start, match.start()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return [(s, e) for s, e in (_strip(text, s, e) for s, e in spans) if s < e]
+
+
+def _strip(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
@@ -0,0 +1,125 @@
+"""
+Serve the API from several worker processes that share one copy of the model.
+
+    python serve.py --workers 8 --host 0.0.0.0 --port 8000
+
+`uvicorn --workers N` starts N fresh interpreters, each importing app.py and
+loading its own Piiranha weights. Here the parent imports app.py, loads the
+model, binds the socket and then forks the workers, so the weights are shared
+copy-on-write: the tensors are never written after loading, and gc.freeze()
+keeps the garbage collector from touching the objects around them. A worker
+that dies is forked again from the parent, with the model already loaded.
+
+Each worker runs PII_MODEL_THREADS threads per forward pass, by default the
+cores divided by the workers. ONNX Runtime's thread pool does not survive
+fork(), so the ONNX backends always run one thread per worker; start one
+worker per core for them.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+
+logger = logging.getLogger("serve")
+
+# A worker that exits sooner than this after starting is restarted only
+# after a pause, so a worker failing at startup does not fork in a tight loop
+MIN_WORKER_SECONDS = 5
+
+
+def run_worker(app, config, sock):
+    import uvicorn
+
+    # The parent forwards signals itself; a terminal's Ctrl-C must not reach
+    # the workers twice, which uvicorn treats as a forced exit
+    os.setpgid(0, 0)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+    app.pseudonymizer.reconnect()
+    logger.info(f"🚀 Worker {os.getpid()} serving on http://{config.host}:{config.port}")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    backend = os.environ.get("PII_MODEL_BACKEND", "torch")
+    if backend.startswith("onnx"):
+        os.environ["PII_MODEL_THREADS"] = "1"
+    else:
+        os.environ.setdefault("PII_MODEL_THREADS", str(max(1, (os.cpu_count() or 1) // args.workers)))
+    # The tokenizers' own thread pool is not fork-safe either
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    import uvicorn
+    import app
+
+    if not app.model_loader.wait():
+        sys.exit(f"Model failed to load: {app.model_loader.error}")
+    config = uvicorn.Config(app.app, host=args.host, port=args.port, log_level=args.log_level)
+    sock = config.bind_socket()
+
+    # Objects allocated so far are never collected, so collections in the
+    # workers don't write to (and unshare) the pages holding them
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(app, config, sock)
+            except BaseException:
+                logger.exception(f"❌ Worker {os.getpid()} failed")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(args.workers):
+        spawn()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"✅ Started {args.workers} workers sharing {app.MODEL_VERSION}, "
+                f"{os.environ['PII_MODEL_THREADS']} model threads each")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it")
+        if time.monotonic() - started < MIN_WORKER_SECONDS:
+            time.sleep(MIN_WORKER_SECONDS)
+        if not stopping:
+            spawn()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
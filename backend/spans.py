@@ -0,0 +1,98 @@
+"""Overlap resolution between detected spans, and single-pass text rewriting."""
+from bisect import bisect_left
+
+# How /detect_pii settles overlaps between model and regex entities:
+# - "model": every model entity, then regex entities that fit around them
+# - "longest": longer spans first, then higher confidence
+# - "confidence": higher confidence first, then longer spans
+MERGE_POLICIES = ("model", "longest", "confidence")
+
+
+class SpanIndex:
+    """Union of half-open [start, end) spans answering overlap queries.
+
+    Spans are kept as sorted, disjoint runs, so ``overlaps`` is a binary
+    search and ``add`` touches only the runs it merges with. Overlap uses
+    the same test as entity dedup everywhere in this service:
+    ``start < other_end and end > other_start``.
+    """
+
+    def __init__(self, spans=()):
+        self._starts = []
+        self._ends = []
+        for start, end in spans:
+            self.add(start, end)
+
+    def overlaps(self, start, end):
+        i = bisect_left(self._starts, end)
+        return i > 0 and self._ends[i - 1] > start
+
+    def add(self, start, end):
+        # Runs are disjoint, so their ends are sorted like their starts; the
+        # ones overlapping [start, end) form the slice [first, last)
+        last = bisect_left(self._starts, end)
+        first = last
+        while first > 0 and self._ends[first - 1] > start:
+            first -= 1
+        if first < last:
+            start = min(start, self._starts[first])
+            end = max(end, self._ends[last - 1])
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+
+
+def select_non_overlapping(candidates, index=None):
+    """
+    Candidates (in priority order) that overlap neither an earlier accepted
+    candidate nor a span already in index.
+    """
+    index = SpanIndex() if index is None else index
+    selected = []
+    for entity in candidates:
+        if not index.overlaps(entity["start"], entity["end"]):
+            index.add(entity["start"], entity["end"])
+            selected.append(entity)
+    return selected
+
+
+def merge_entities(model_entities, regex_entities, policy="model"):
+    """
+    Combine model and regex entities under a MERGE_POLICIES policy.
+    Returns the merged list sorted by position and the number of regex
+    entities it kept.
+    """
+    if policy == "model":
+        index = SpanIndex((e["start"], e["end"]) for e in model_entities)
+        regex_kept = select_non_overlapping(regex_entities, index)
+        merged = list(model_entities) + regex_kept
+        regex_added = len(regex_kept)
+    else:
+        if policy == "longest":
+            rank = lambda e: (e["start"] - e["end"], -e["confidence"])
+        elif policy == "confidence":
+            rank = lambda e: (-e["confidence"], e["start"] - e["end"])
+        else:
+            raise ValueError(f"Unknown merge policy {policy!r}, expected one of {', '.join(MERGE_POLICIES)}")
+        regex_ids = {id(e) for e in regex_entities}
+        merged = select_non_overlapping(sorted(list(model_entities) + list(regex_entities), key=rank))
+        regex_added = sum(1 for e in merged if id(e) in regex_ids)
+
+    merged.sort(key=lambda x: x["start"])
+    return merged, regex_added
+
+
+def rewrite(text, replacements):
+    """
+    Build text with each (start, end, replacement) applied, in one pass.
+    Replacements overlapping an earlier one (by start) are skipped.
+    """
+    segments = []
+    position = 0
+    for start, end, replacement in sorted(replacements, key=lambda r: r[0]):
+        if start < position:
+            continue
+        segments.append(text[position:start])
+        segments.append(replacement)
+        position = end
+    segments.append(text[position:])
+    return "".join(segments)
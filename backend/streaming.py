@@ -0,0 +1,89 @@
+"""Line framing and record encoding for streamed anonymization."""
+import json
+
+FORMATS = ("ndjson", "text")
+
+
+class LineSplitter:
+    """Split a byte stream into lines without holding more than one line.
+
+    ``feed`` returns the lines completed by a chunk, decoded as UTF-8 and
+    without the newline. A line longer than ``max_line`` bytes is dropped
+    and returned as ``None`` so the caller can report it.
+    """
+
+    def __init__(self, max_line=1024 * 1024):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self._oversized = False
+
+    def feed(self, chunk):
+        lines = []
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            end = len(chunk) if newline < 0 else newline
+            if not self._oversized:
+                self._buffer += chunk[start:end]
+                if len(self._buffer) > self.max_line:
+                    self._oversized = True
+                    self._buffer.clear()
+            if newline < 0:
+                return lines
+            lines.append(None if self._oversized else self._buffer.decode("utf-8", "replace"))
+            self._buffer.clear()
+            self._oversized = False
+            start = newline + 1
+
+    def close(self):
+        """Lines left after the last chunk (an unterminated final line)."""
+        if self._oversized:
+            lines = [None]
+        elif self._buffer:
+            lines = [self._buffer.decode("utf-8", "replace")]
+        else:
+            lines = []
+        self._buffer.clear()
+        self._oversized = False
+        return lines
+
+
+def parse_line(line, fmt, field="text"):
+    """
+    Split an input line into (record, text). text is None when there is
+    nothing to anonymize; record then holds what to write back as is.
+    """
+    if line is None:
+        return {"error": "record too long"}, None
+    if fmt == "text":
+        return None, line
+    if not line.strip():
+        return "", None
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return {"error": f"invalid JSON: {e}"}, None
+    if isinstance(record, str):
+        return record, record
+    if isinstance(record, dict) and isinstance(record.get(field), str):
+        return record, record[field]
+    return record, None
+
+
+def render_line(record, fmt, field="text", anonymized_text=None, entities=None):
+    """Output line (with newline) for a record parsed by parse_line."""
+    if fmt == "text":
+        if anonymized_text is None:
+            return json.dumps(record) + "\n"
+        return anonymized_text + "\n"
+    if record == "":
+        return "\n"
+    if anonymized_text is not None:
+        if isinstance(record, str):
+            record = anonymized_text
+        else:
+            record = dict(record)
+            record[field] = anonymized_text
+            if entities is not None:
+                record["entities"] = entities
+    return json.dumps(record, ensure_ascii=False) + "\n"
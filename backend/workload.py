@@ -0,0 +1,256 @@
+"""
+Synthetic, reproducible texts for benchmarking PII detection.
+
+    python workload.py -n 2000 --seed 7 -o corpus.ndjson
+    python workload.py --kinds adversarial --format text
+
+Each record is {"kind": ..., "text": ...}. Kinds:
+- chat: short messages with Singapore names, NRICs, phones and emails
+- address: HDB blocks, streets, condos and postal codes
+- form: several labelled fields (DOB, card, licence, account, password)
+- clean: ordinary text with no PII
+- log: long noisy application logs with PII scattered through them
+- adversarial: inputs aimed at the slow paths of the regex patterns
+The same seed always gives the same corpus.
+"""
+import argparse
+import json
+import random
+import sys
+
+GIVEN_NAMES = [
+    "Wei Ming", "Jia Hui", "Kai Xuan", "Hui Min", "Jun Jie", "Xin Yi", "Zhi Hao", "Mei Ling",
+    "Nurul", "Aisyah", "Farhan", "Siti", "Hafiz", "Priya", "Arjun", "Kavitha", "Rajesh",
+    "Sarah", "John", "Rachel", "Daniel", "Michelle", "Ryan",
+]
+SURNAMES = [
+    "Tan", "Lim", "Lee", "Ng", "Ong", "Wong", "Goh", "Teo", "Chua", "Koh", "Yeo", "Sim",
+    "Ahmad", "Rahman", "Ismail", "Kumar", "Singh", "Nair", "Pillai", "Smith", "Brown",
+]
+STREETS = [
+    "Ang Mo Kio Avenue 3", "Bedok North Street 1", "Tampines Street 21", "Jurong West Street 52",
+    "Toa Payoh Lorong 4", "Yishun Ring Road", "Clementi Avenue 2", "Bukit Timah Road",
+    "Serangoon Road", "Anson Road", "Holland Drive", "Upper Thomson Road",
+]
+ESTATES = [
+    "Parc Esta Condominium", "The Interlace Residences", "Marina One Residences",
+    "Sunrise Gardens Estate", "Tanglin Court", "Bishan Park Condo",
+]
+DOMAINS = ["example.com", "mail.com.sg", "company.sg", "gmail.com", "outlook.com"]
+FILLER = (
+    "please confirm the booking for next week thanks for the quick reply "
+    "the meeting is moved to the second floor room we will send the slides "
+    "after lunch the delivery should arrive between two and four pm "
+    "let me know if anything changes the report is attached for review"
+).split()
+LOG_LEVELS = ["DEBUG", "INFO", "INFO", "INFO", "WARN", "ERROR"]
+LOG_EVENTS = [
+    "request completed", "cache miss for key", "retrying upstream call", "session refreshed",
+    "payload validated", "queue depth", "user updated profile", "sent notification",
+]
+
+KINDS = ("chat", "address", "form", "clean", "log", "adversarial")
+
+NRIC_WEIGHTS = (2, 7, 6, 5, 4, 3, 2)
+NRIC_CHECK = {"S": "JZIHGFEDCBA", "T": "JZIHGFEDCBA", "F": "XWUTRQPNMLK", "G": "XWUTRQPNMLK"}
+
+
+def nric(rng):
+    """NRIC/FIN with a valid check letter."""
+    prefix = rng.choice("STFG")
+    digits = [rng.randrange(10) for _ in range(7)]
+    total = sum(d * w for d, w in zip(digits, NRIC_WEIGHTS)) + (4 if prefix in "TG" else 0)
+    return prefix + "".join(map(str, digits)) + NRIC_CHECK[prefix][total % 11]
+
+
+def name(rng):
+    return f"{rng.choice(SURNAMES)} {rng.choice(GIVEN_NAMES)}"
+
+
+def phone(rng):
+    number = f"{rng.choice('689')}{rng.randrange(10**7):07d}"
+    style = rng.randrange(4)
+    if style == 0:
+        return number
+    if style == 1:
+        return f"{number[:4]} {number[4:]}"
+    if style == 2:
+        return f"+65 {number[:4]} {number[4:]}"
+    return f"{number[:4]}-{number[4:]}"
+
+
+def email(rng, person=None):
+    local = (person or name(rng)).lower().replace(" ", rng.choice([".", "_", ""]))
+    return f"{local}{rng.randrange(100)}@{rng.choice(DOMAINS)}"
+
+
+def address(rng):
+    style = rng.randrange(3)
+    postal = f"{rng.randrange(10, 83)}{rng.randrange(10**4):04d}"
+    unit = f"#{rng.randrange(1, 25):02d}-{rng.randrange(1, 400):02d}"
+    if style == 0:
+        return f"Blk {rng.randrange(1, 999)} {rng.choice(STREETS)}, {unit}, Singapore {postal}"
+    if style == 1:
+        return f"{rng.randrange(1, 200)} {rng.choice(STREETS)}, Singapore {postal}"
+    return f"{rng.choice(ESTATES)}, {rng.randrange(1, 60)} {rng.choice(STREETS)} {unit}"
+
+
+def filler(rng, words):
+    return " ".join(rng.choice(FILLER) for _ in range(words))
+
+
+def chat(rng):
+    person = name(rng)
+    templates = [
+        lambda: f"Hi, my name is {person} and my NRIC is {nric(rng)}.",
+        lambda: f"Please call me at {phone(rng)} or email {email(rng, person)}.",
+        lambda: f"Hello {person}, {filler(rng, 8)}. Reach me on {phone(rng)}.",
+        lambda: f"I'm {person}, {filler(rng, 6)}.",
+        lambda: f"Dear {person}, {filler(rng, 12)}. Regards, {name(rng)}",
+    ]
+    return " ".join(rng.choice(templates)() for _ in range(rng.randrange(1, 4)))
+
+
+def address_text(rng):
+    return rng.choice([
+        lambda: f"I live at {address(rng)}.",
+        lambda: f"Deliver to {name(rng)}, {address(rng)} before 5pm.",
+        lambda: f"Postal code {rng.randrange(10, 83)}{rng.randrange(10**4):04d}, {filler(rng, 5)}.",
+    ])()
+
+
+def form(rng):
+    fields = [
+        f"Name: {name(rng)}",
+        f"DOB: born on {rng.randrange(1, 29)} {rng.choice(['January', 'March', 'July', 'October'])} {rng.randrange(1950, 2006)}",
+        f"Card: 4{rng.randrange(1000):03d} {rng.randrange(10**4):04d} {rng.randrange(10**4):04d} {rng.randrange(10**4):04d}",
+        f"Driving licence: {nric(rng)}",
+        f"Bank account {rng.randrange(10**9, 10**12)}",
+        f"Password: {rng.choice(['Hunter2', 'S3cure!pass', 'letmein88'])}{rng.randrange(1000)}",
+        f"Tax ID {rng.randrange(10, 99)}-{rng.randrange(10**6, 10**7)}",
+        f"Email: {email(rng)}",
+    ]
+    rng.shuffle(fields)
+    return "\n".join(fields[:rng.randrange(3, len(fields) + 1)])
+
+
+def clean(rng):
+    return " ".join(filler(rng, rng.randrange(6, 20)).capitalize() + "." for _ in range(rng.randrange(1, 5)))
+
+
+def log(rng, lines=None):
+    output = []
+    for i in range(lines or rng.randrange(40, 200)):
+        event = rng.choice(LOG_EVENTS)
+        detail = f"id={rng.randrange(10**8)} latency_ms={rng.randrange(1, 900)}"
+        if rng.random() < 0.15:
+            detail += rng.choice([f" user={email(rng)}", f" phone={phone(rng)}", f" nric={nric(rng)}"])
+        output.append(f"2024-05-{rng.randrange(1, 29):02d}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:"
+                      f"{rng.randrange(60):02d}Z {rng.choice(LOG_LEVELS)} worker-{i % 8} {event} {detail}")
+    return "\n".join(output)
+
+
+# Inputs of about n characters aimed at the slow paths of the regex patterns:
+# near-misses that make the engine backtrack or scan far. Detection time must
+# grow linearly with n on every shape (benchmark.py scaling checks it).
+ADVERSARIAL_SHAPES = {
+    # Email-like text without a valid domain
+    "email_local": lambda n: "a" * n + "@",
+    "email_dots": lambda n: "a." * (n // 2) + "@",
+    "email_domain": lambda n: "a@" + "b." * (n // 2),
+    # Name triggers followed by nothing usable, or by many capitalised words
+    "name_is": lambda n: "name is " * (n // 8),
+    "name_is_caps": lambda n: "my name is " + "Abc " * (n // 4),
+    "hi_caps": lambda n: ("Hi " + "Abc " * 3) * (n // 15),
+    "surname_caps": lambda n: "Tan Abc " * (n // 8),
+    # Long free-text and whitespace runs around address keywords
+    "digit_words": lambda n: "1 " + "ab " * (n // 3),
+    "digit_words_many": lambda n: "1 ab cd ef " * (n // 11),
+    "spaces_road": lambda n: "1" + " " * n + "Road",
+    "spaces_blk": lambda n: "Blk" + " " * (n // 2) + "1" + " " * (n // 2) + "x",
+    "shopping": lambda n: "a " * (n // 2) + "Shopping",
+    "centre": lambda n: "1 " + "x " * (n // 2) + "Centre!",
+    "condo": lambda n: ("ab " * 20 + "Condo ") * (n // 66),
+    "comma_singapore": lambda n: "1 " + "abcde " * (n // 6) + ", x, Singapore",
+    # Block/unit prefixes repeated without an address
+    "blk": lambda n: "Blk 1 " * (n // 6),
+    # Digit runs just too long or too short for card/account/NRIC patterns
+    "digits": lambda n: "9" * n,
+    "digit_runs": lambda n: " ".join("9" * (18 + i % 12) for i in range(n // 25)),
+    "digit_groups": lambda n: "1234 " * (n // 5),
+    "nric_like": lambda n: "S" + "1" * n + "A",
+    "dates": lambda n: "12/12/12 " * (n // 9),
+    # Password keywords without a usable value
+    "password": lambda n: "password: " * (n // 10),
+}
+
+
+def adversarial(rng):
+    """One of the ADVERSARIAL_SHAPES at a random size."""
+    shape = rng.choice(list(ADVERSARIAL_SHAPES))
+    return ADVERSARIAL_SHAPES[shape](rng.choice([200, 1000, 5000]))
+
+
+GENERATORS = {
+    "chat": chat,
+    "address": address_text,
+    "form": form,
+    "clean": clean,
+    "log": log,
+    "adversarial": adversarial,
+}
+
+# Default mix: mostly short interactive texts, a few long and hostile ones
+DEFAULT_WEIGHTS = {"chat": 40, "address": 15, "form": 15, "clean": 20, "log": 5, "adversarial": 5}
+
+
+def generate(n, seed=0, kinds=None):
+    """n records as (kind, text), drawn from kinds (default: the standard mix)."""
+    rng = random.Random(seed)
+    weights = DEFAULT_WEIGHTS if not kinds else {kind: 1 for kind in kinds}
+    names = list(weights)
+    for kind in rng.choices(names, weights=[weights[k] for k in names], k=n):
+        yield kind, GENERATORS[kind](rng)
+
+
+def load(path):
+    """(kind, text) records from an NDJSON corpus or a file of one text per line."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                records.append((record.get("kind", "file"), record["text"]))
+            else:
+                records.append(("file", line.rstrip("\n")))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1000, help="number of records")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", help=f"comma-separated subset of {','.join(KINDS)}")
+    parser.add_argument("--format", choices=("ndjson", "text"), default="ndjson",
+                        help="text writes one text per line, newlines replaced by spaces")
+    parser.add_argument("-o", "--output", default="-")
+    args = parser.parse_args()
+
+    kinds = [k.strip() for k in args.kinds.split(",")] if args.kinds else None
+    for kind in kinds or ():
+        if kind not in GENERATORS:
+            parser.error(f"unknown kind {kind!r}, expected one of {', '.join(KINDS)}")
+
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    with sink:
+        for kind, text in generate(args.n, args.seed, kinds):
+            if args.format == "text":
+                sink.write(text.replace("\n", " ") + "\n")
+            else:
+                sink.write(json.dumps({"kind": kind, "text": text}, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()